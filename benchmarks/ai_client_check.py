@@ -0,0 +1,119 @@
+"""Exercise AIClient against a local stub server, without Home Assistant.
+
+    python benchmarks/ai_client_check.py
+
+Covers retries on 5xx, 429 with Retry-After, giving up after AI_RETRIES, no
+retry on other errors, and answers served from the persistent cache across a
+simulated restart. Exits with status 1 on the first failed check.
+"""
+import asyncio
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ha_stubs import load_package  # noqa: E402
+
+load_package()
+
+from custom_components.chinese_calendar.ai_client import AIClient, AIResponseCache  # noqa: E402
+
+DAY = date.today()
+
+
+class StubEndpoint:
+    """Chat completions endpoint that answers with scripted (status, headers) pairs, then 200."""
+
+    def __init__(self):
+        self.script = []
+        self.calls = 0
+
+    def reset(self, *script):
+        self.script, self.calls = list(script), 0
+
+    async def handle(self, request):
+        self.calls += 1
+        prompt = (await request.json())["messages"][0]["content"]
+        if self.script:
+            status, headers = self.script.pop(0)
+            return web.json_response({"error": status}, status=status, headers=headers)
+        return web.json_response({"choices": [{"message": {"content": f"答:{prompt}"}}]})
+
+
+class MemoryStore:
+    """Stands in for helpers.storage.Store; saves immediately so a second cache sees the data."""
+
+    def __init__(self, data=None):
+        self.data = data
+
+    async def async_load(self):
+        return self.data
+
+    def async_delay_save(self, data_func, delay=0):
+        self.data = dict(data_func())
+
+
+def new_cache(store):
+    cache = AIResponseCache.__new__(AIResponseCache)
+    cache._store, cache._data, cache._lock = store, None, asyncio.Lock()
+    return cache
+
+
+def check(name, condition, detail=""):
+    print(f"{'ok  ' if condition else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+    if not condition:
+        raise SystemExit(1)
+
+
+async def main():
+    endpoint = StubEndpoint()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", endpoint.handle)
+    async with TestServer(app) as server, aiohttp.ClientSession() as session:
+        url = str(server.make_url(""))
+        client = AIClient(session, url, "key", retries=2, backoff=0.05)
+
+        endpoint.reset((500, {}), (503, {}))
+        content = await client.async_chat("m", "你好")
+        check("5xx is retried", content == "答:你好" and endpoint.calls == 3, f"calls={endpoint.calls}")
+
+        endpoint.reset((500, {}), (500, {}), (500, {}))
+        content = await client.async_chat("m", "你好")
+        check("gives up after retries", content is None and endpoint.calls == 3, f"calls={endpoint.calls}")
+
+        endpoint.reset((400, {}))
+        content = await client.async_chat("m", "你好")
+        check("4xx is not retried", content is None and endpoint.calls == 1, f"calls={endpoint.calls}")
+
+        slow = AIClient(session, url, "key", retries=1, backoff=30)
+        endpoint.reset((429, {"Retry-After": "0"}))
+        start = time.perf_counter()
+        content = await slow.async_chat("m", "你好")
+        elapsed = time.perf_counter() - start
+        check("429 honours Retry-After over backoff", content == "答:你好" and endpoint.calls == 2 and elapsed < 5, f"{elapsed:.2f}s")
+
+        store = MemoryStore()
+        cached = AIClient(session, url, "key", new_cache(store), retries=0)
+        endpoint.reset()
+        first = await cached.async_complete("m", "运势", "alice", DAY)
+        second = await cached.async_complete("m", "运势", "alice", DAY)
+        check("repeat request is a cache hit", first == second == "答:运势" and endpoint.calls == 1, f"calls={endpoint.calls}")
+
+        restarted = AIClient(session, url, "key", new_cache(MemoryStore(store.data)), retries=0)
+        content = await restarted.async_complete("m", "运势", "alice", DAY)
+        check("cache survives a restart", content == "答:运势" and endpoint.calls == 1, f"calls={endpoint.calls}")
+
+        await restarted.async_complete("m", "运势2", "alice", DAY)
+        await restarted.async_complete("m2", "运势", "alice", DAY)
+        await restarted.async_complete("m", "运势", "bob", DAY)
+        check("prompt, model and person are part of the key", endpoint.calls == 4, f"calls={endpoint.calls}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
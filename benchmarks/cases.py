@@ -0,0 +1,141 @@
+"""Benchmark cases for the almanac, moon, birthday, event and text conversion hot paths.
+
+Every factory is an async function that performs its one-off setup and returns
+a zero-argument callable (plain or async) that the runner times.
+"""
+from datetime import datetime, timedelta
+
+from ha_stubs import StubHass, load_package
+
+load_package()
+
+from custom_components.chinese_calendar.almanac_engine import ALMANAC_TYPES, AlmanacEngine  # noqa: E402
+from custom_components.chinese_calendar.almanac_sensor import AlmanacDevice, AlmanacSensor  # noqa: E402
+from custom_components.chinese_calendar.almanac_table import AlmanacTable, async_get_lunar, lunar_loader  # noqa: E402
+from custom_components.chinese_calendar.birthday_manager import BirthdayDevice, BirthdaySensor  # noqa: E402
+from custom_components.chinese_calendar.const import DATA_FORMAT, EVENT_DATE_FORMAT  # noqa: E402
+from custom_components.chinese_calendar.event_manager import EventDevice, EventSensor  # noqa: E402
+from custom_components.chinese_calendar.records import next_lunar_birthday  # noqa: E402
+from custom_components.chinese_calendar.moon import AlmanacDevice as MoonDevice, AlmanacMoonSensor  # noqa: E402
+from custom_components.chinese_calendar.moon_ephemeris import PhaseCalendar  # noqa: E402
+from custom_components.chinese_calendar.text_convert import load_zhconv, to_hant  # noqa: E402
+
+ENTRY_ID = "benchmark"
+NOW = datetime(2025, 6, 15, 10, 20)
+SAMPLE_TEXT = "今日宜祭祀祈福，忌动土破屋；吉神方位喜神东南，财神正北，福神西南"
+
+CASES = {}
+
+
+def case(name):
+    def register(factory):
+        CASES[name] = factory
+        return factory
+    return register
+
+
+async def _almanac_sensor(hass, sensor_type):
+    device = AlmanacDevice(ENTRY_ID, "中国老黄历")
+    await device.async_setup(hass)
+    engine = AlmanacEngine(device, AlmanacSensor._get_lunar_data, AlmanacTable.lookup)
+    return AlmanacSensor(device, "中国老黄历", sensor_type, False, hass, engine), engine
+
+
+def _update_general_case(sensor_type):
+    async def factory(hass):
+        sensor, engine = await _almanac_sensor(hass, sensor_type)
+        await engine.async_snapshot(NOW)
+
+        async def run():
+            await sensor._update_general(NOW)
+        return run
+    return factory
+
+
+for _type in ALMANAC_TYPES:
+    case(f"almanac.update_general.{_type}")(_update_general_case(_type))
+
+
+@case("almanac.snapshot.cold")
+async def almanac_snapshot_cold(hass):
+    _, engine = await _almanac_sensor(hass, ALMANAC_TYPES[0])
+    await AlmanacSensor._get_lunar_data(NOW)
+
+    async def run():
+        engine.clear()
+        await engine.async_snapshot(NOW)
+    return run
+
+
+@case("lunar.get_lunar_data.cold")
+async def lunar_cold(hass):
+    async def run():
+        lunar_loader.cache.clear()
+        await AlmanacSensor._get_lunar_data(NOW)
+    return run
+
+
+@case("lunar.get_lunar_data.warm")
+async def lunar_warm(hass):
+    await AlmanacSensor._get_lunar_data(NOW)
+
+    async def run():
+        await AlmanacSensor._get_lunar_data(NOW)
+    return run
+
+
+@case("moon.async_update")
+async def moon_update(hass):
+    sensor = AlmanacMoonSensor(MoonDevice(ENTRY_ID, "中国老黄历"), "月相")
+    sensor.hass = hass
+    await sensor.async_update()
+    return sensor.async_update
+
+
+@case("moon.phase_calendar")
+async def moon_phase_calendar(hass):
+    return lambda: PhaseCalendar(NOW)
+
+
+@case("birthday.analyze_daily_fortune")
+async def birthday_fortune(hass):
+    person = {"name": "张三", "birthday": datetime(1990, 3, 8, 14).strftime(DATA_FORMAT)}
+    sensor = BirthdaySensor(hass, BirthdayDevice(ENTRY_ID), person, "八字", ENTRY_ID)
+    birth_lunar = await async_get_lunar(sensor._birthday)
+    today_lunar = await async_get_lunar(NOW)
+    return lambda: sensor._analyze_daily_fortune(birth_lunar, today_lunar)
+
+
+@case("birthday.next_lunar_birthday")
+async def birthday_next_lunar(hass):
+    birthday = datetime(1990, 3, 8).date()
+    next_lunar_birthday(birthday, NOW.date())
+    return lambda: next_lunar_birthday(birthday, NOW.date())
+
+
+@case("event.async_update.full_countdown")
+async def event_full_countdown(hass):
+    event_date = (datetime.now() + timedelta(days=1)).strftime(EVENT_DATE_FORMAT)
+    sensor = EventSensor(EventDevice(ENTRY_ID), "纪念日", event_date, "", full_countdown=True, hass=hass)
+
+    async def run():
+        sensor._last_update = None
+        await sensor.async_update()
+    return run
+
+
+@case("text.zhconv.convert")
+async def zhconv_convert(hass):
+    zhconv = load_zhconv()
+    zhconv.convert(SAMPLE_TEXT, "zh-hant")
+    return lambda: zhconv.convert(SAMPLE_TEXT, "zh-hant")
+
+
+@case("text.to_hant.cached")
+async def to_hant_cached(hass):
+    to_hant(SAMPLE_TEXT)
+    return lambda: to_hant(SAMPLE_TEXT)
+
+
+def new_hass():
+    return StubHass()
@@ -0,0 +1,113 @@
+"""Minimal stand-ins for the Home Assistant modules the integration imports.
+
+Only installed when Home Assistant itself is not importable, or when
+BENCH_STUB_HA=1 is set, so the suite runs against a real installation unchanged.
+"""
+import enum
+import importlib.util
+import os
+import sys
+import types
+from datetime import datetime
+from pathlib import Path
+
+PACKAGE = "custom_components.chinese_calendar"
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "chinese_calendar"
+
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = sys.modules.get(name) or types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(_module(parent), child, module)
+    return module
+
+
+class _Entity:
+    hass = None
+    entity_id = None
+
+    def async_write_ha_state(self):
+        pass
+
+
+class EntityCategory(str, enum.Enum):
+    CONFIG = "config"
+    DIAGNOSTIC = "diagnostic"
+
+
+class SensorDeviceClass(str, enum.Enum):
+    ENUM = "enum"
+
+
+class _Registry:
+    def async_get(self, entity_id):
+        return None
+
+    async def async_remove(self, entity_id):
+        pass
+
+
+def _identity(value):
+    return value
+
+
+def install() -> None:
+    if os.environ.get("BENCH_STUB_HA") != "1" and importlib.util.find_spec("homeassistant") is not None:
+        return
+    _module("homeassistant")
+    _module("homeassistant.core", HomeAssistant=object, ServiceCall=object, callback=_identity)
+    _module("homeassistant.config_entries", ConfigEntry=object)
+    _module("homeassistant.exceptions", HomeAssistantError=Exception)
+    _module("homeassistant.components.sensor", SensorEntity=_Entity, SensorDeviceClass=SensorDeviceClass)
+    _module("homeassistant.helpers.entity", DeviceInfo=dict, EntityCategory=EntityCategory)
+    _module("homeassistant.helpers.device_registry", DeviceInfo=dict)
+    _module("homeassistant.helpers.entity_platform", AddEntitiesCallback=object)
+    _module(
+        "homeassistant.helpers.event",
+        async_track_time_change=lambda *a, **k: (lambda: None),
+        async_track_time_interval=lambda *a, **k: (lambda: None),
+        async_track_point_in_time=lambda *a, **k: (lambda: None),
+    )
+    _module(
+        "homeassistant.helpers.entity_registry",
+        async_get=lambda hass: _Registry(),
+        async_entries_for_config_entry=lambda registry, entry_id: [],
+    )
+    _module("homeassistant.helpers.config_validation", date=_identity, boolean=bool, ensure_list=_identity)
+    _module("homeassistant.util.dt", now=datetime.now, as_local=_identity)
+
+
+def load_package() -> None:
+    """Register the integration as a bare package so its __init__ (frontend, http, lovelace) is not executed."""
+    install()
+    if PACKAGE in sys.modules:
+        return
+    _module("custom_components").__path__ = [str(PACKAGE_DIR.parent)]
+    _module(PACKAGE).__path__ = [str(PACKAGE_DIR)]
+
+
+class StubConfig:
+    def __init__(self, language: str):
+        self.language = language
+
+    def path(self, *parts):
+        return str(Path("/tmp").joinpath(*parts))
+
+
+class StubServices:
+    async def async_call(self, *args, **kwargs):
+        pass
+
+
+class StubHass:
+    def __init__(self, language: str = "zh-Hans"):
+        self.config = StubConfig(language)
+        self.data = {}
+        self.services = StubServices()
+
+    async def async_add_executor_job(self, func, *args):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
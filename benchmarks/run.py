@@ -0,0 +1,132 @@
+"""Run the benchmark suite without Home Assistant.
+
+    python benchmarks/run.py                       # run everything
+    python benchmarks/run.py -k almanac.snapshot   # only matching cases
+    python benchmarks/run.py --save baseline.json  # record a baseline
+    python benchmarks/run.py --compare baseline.json --threshold 0.2
+
+ops/sec comes from repeated calls for at least --min-time seconds. Allocation
+figures come from a separate tracemalloc pass over --alloc-iterations calls.
+peak_bytes is the mean peak allocation of a single call. retained_bytes is the
+memory still held per call once the pass ends. With --compare, the exit status
+is 1 when any case is slower than the baseline by more than --threshold.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cases import CASES, new_hass  # noqa: E402
+
+
+async def _call(fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _time(fn, min_time: float, min_iterations: int = 5) -> tuple:
+    iterations, elapsed = 0, 0.0
+    batch = 1
+    while elapsed < min_time or iterations < min_iterations:
+        start = time.perf_counter()
+        for _ in range(batch):
+            await _call(fn)
+        elapsed += time.perf_counter() - start
+        iterations += batch
+        batch = min(batch * 2, 10000)
+    return iterations, elapsed
+
+
+async def _allocations(fn, iterations: int) -> dict:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peaks = 0
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            await _call(fn)
+            peaks += tracemalloc.get_traced_memory()[1] - current
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": round(peaks / iterations), "retained_bytes": round(retained / iterations)}
+
+
+async def run_case(name: str, factory, args) -> dict:
+    fn = await factory(new_hass())
+    await _call(fn)
+    iterations, elapsed = await _time(fn, args.min_time)
+    result = {
+        "ops_per_sec": round(iterations / elapsed, 2),
+        "mean_us": round(elapsed / iterations * 1e6, 3),
+        "iterations": iterations,
+    }
+    result.update(await _allocations(fn, args.alloc_iterations))
+    return result
+
+
+def _compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        if (old := baseline.get(name)) is None:
+            continue
+        ratio = old["ops_per_sec"] / result["ops_per_sec"] if result["ops_per_sec"] else float("inf")
+        result["vs_baseline"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _print(results: dict, regressions: list) -> None:
+    width = max(map(len, results), default=4)
+    print(f"{'case':<{width}}  {'ops/sec':>12}  {'mean µs':>10}  {'peak B':>9}  {'kept B':>8}  {'slowdown':>8}")
+    for name, r in results.items():
+        slowdown = f"{r['vs_baseline']:.2f}x" if "vs_baseline" in r else "-"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<{width}}  {r['ops_per_sec']:>12,.1f}  {r['mean_us']:>10.2f}  {r['peak_bytes']:>9}  {r['retained_bytes']:>8}  {slowdown:>8}{flag}")
+
+
+async def main(args) -> int:
+    selected = {name: factory for name, factory in CASES.items() if not args.k or any(k in name for k in args.k)}
+    results = {}
+    for name, factory in selected.items():
+        results[name] = await run_case(name, factory, args)
+
+    regressions = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = _compare(results, baseline.get("results", {}), args.threshold)
+    _print(results, regressions)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", action="append", help="only run cases whose name contains this substring (repeatable)")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds to spend timing each case")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="calls traced for allocation figures")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before a case counts as a regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
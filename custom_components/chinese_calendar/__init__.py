@@ -2,25 +2,35 @@ import asyncio
 import weakref
 import time
 from typing import Dict, Set, Optional, List
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.util import yaml
+from homeassistant.util import dt as dt_util
 from homeassistant.helpers import entity_registry
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.components.lovelace import DOMAIN
 from homeassistant.components.frontend import add_extra_js_url
-from homeassistant.components.http import StaticPathConfig, HomeAssistantView
+from homeassistant.components.http import KEY_AUTHENTICATED, StaticPathConfig, HomeAssistantView
 from aiohttp import web
-from datetime import datetime
-from .services import async_setup_date_service, SERVICE_DATE_CONTROL
+from datetime import date, datetime
+from .services import async_setup_date_service, async_query_almanac, async_query_almanac_range, async_query_upcoming, SERVICE_DATE_CONTROL
+from .almanac_table import async_setup_almanac_table
+from .text_convert import async_preload_converter
+from .timing import timed_setup
+from .records import RecordIndex, get_records, migrate_flat_records
+from .reconcile import async_reconcile_entities
+from .ai_client import shutdown_ai_clients
+from .birthday_manager import BirthdaySensorGroup
 from .const import (
     DOMAIN, 
     PLATFORMS, 
     CONF_BIRTHDAY_ENABLED,
     CONF_EVENT_ENABLED,
-    MAX_BIRTHDAYS,
-    MAX_EVENTS,
+    CONF_BIRTHDAYS,
+    CONF_EVENTS,
+    CONF_LUNAR_CACHE_SIZE,
+    DEFAULT_LUNAR_CACHE_SIZE,
 )
 
 class TaskManager:
@@ -55,66 +65,102 @@ class TaskManager:
                 finally:
                     self._tasks.clear()
                     
+# Longest first, so 生日提醒_农 is not read as a person named x_生日提醒 with type 农.
+BIRTHDAY_ENTITY_TYPES = sorted(BirthdaySensorGroup.SENSOR_TYPES + ("AI运势",), key=len, reverse=True)
+
 class RegistryManager:
+    """Registry cleanup for birthday and event entities.
+
+    This integration's registry entries are indexed by (prefix, name, type) once and kept current from
+    entity registry events, so cleanup never scans the whole registry.
+    """
+
     def __init__(self, hass: HomeAssistant):
         self.hass = hass
         self._registry = entity_registry.async_get(hass)
         self._cleanup_lock = asyncio.Lock()
         self._entities: Dict[str, str] = {}
+        self._index: Dict[tuple, Dict[Optional[str], Set[str]]] = {}
+        self._keys: Dict[str, tuple] = {}
+        for entry in list(self._registry.entities.values()):
+            self._index_entity(entry)
+        self._unsub = hass.bus.async_listen(entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated)
+
+    def shutdown(self) -> None:
+        if self._unsub:
+            self._unsub()
+        self._unsub = None
 
-    def _get_entity_parts(self, unique_id: str) -> tuple:  
+    def _get_entity_parts(self, unique_id: str) -> tuple:
+        """(prefix, name, type) of birthday_{entry}_{name}_{type} and event_{entry}_{name}; type is None for events."""
         if not unique_id: return None, None, None
-        parts = unique_id.split('_')
-        if len(parts) < 4: return None, None, None
-        return parts[0], parts[2], parts[3]
-
-    def _get_entity_by_base_id(self, registry_entities: Dict, base_name: str, type_name: str) -> List:
-        matching = []
-        for entity in registry_entities.values():
-            if not entity.unique_id: continue
-            prefix, name, type = self._get_entity_parts(entity.unique_id)
-            if prefix == "birthday" and name == base_name and type == type_name:
-                matching.append(entity)
-        return matching
-
-    async def cleanup_orphaned_entities(self, config_entry: ConfigEntry) -> None:
+        parts = unique_id.split('_', 2)
+        if len(parts) < 3: return None, None, None
+        if parts[0] == "event": return parts[0], parts[2], None
+        for type in BIRTHDAY_ENTITY_TYPES:
+            if parts[2].endswith(f"_{type}") and (name := parts[2][:-len(type) - 1]):
+                return parts[0], name, type
+        return None, None, None
+
+    def _index_entity(self, entry) -> None:
+        if entry.platform != DOMAIN: return
+        prefix, name, type = self._get_entity_parts(entry.unique_id)
+        if prefix in ("birthday", "event") and name:
+            self._index.setdefault((prefix, name), {}).setdefault(type, set()).add(entry.entity_id)
+            self._keys[entry.entity_id] = (prefix, name, type)
+
+    def _unindex_entity(self, entity_id: str) -> None:
+        if (key := self._keys.pop(entity_id, None)) is None: return
+        types = self._index[key[:2]]
+        types[key[2]].discard(entity_id)
+        if not types[key[2]]: del types[key[2]]
+        if not types: del self._index[key[:2]]
+
+    @callback
+    def _async_registry_updated(self, event) -> None:
+        entity_id = event.data["entity_id"]
+        self._unindex_entity(event.data.get("old_entity_id", entity_id))
+        self._unindex_entity(entity_id)
+        if event.data["action"] != "remove" and (entry := self._registry.async_get(entity_id)):
+            self._index_entity(entry)
+
+    def _lookup(self, prefix: str, name: str, type_name: Optional[str] = None) -> List:
+        """Registry entries of (prefix, name, type) across all entries; every type of that name when `type_name` is None."""
+        types = self._index.get((prefix, name), {})
+        entity_ids = types.get(type_name, ()) if type_name is not None else [eid for ids in types.values() for eid in ids]
+        return [entry for eid in entity_ids if (entry := self._registry.async_get(eid))]
+
+    async def cleanup_orphaned_entities(self, config_entry: ConfigEntry, old_data: Optional[dict] = None) -> None:
+        """Remove birthday entities of persons that are no longer configured.
+
+        With `old_data` only the persons dropped since then are looked up; without it every entity of the entry is checked.
+        """
         async with self._cleanup_lock:
             try:
-                all_entities = entity_registry.async_entries_for_config_entry(self._registry, config_entry.entry_id)
-                all_registry = self._registry.entities
-                valid_entities = await self._get_valid_entities(config_entry)
-                preserved_entities = {}
-                
-                for entity in all_entities:
-                    if entity.disabled_by is None:
-                        preserved_entities[entity.unique_id] = entity.entity_id
-
-                for entity in all_entities:
+                person_names = {person.get("name", "").lower() for person in get_records(config_entry.data, CONF_BIRTHDAYS).values()}
+                if old_data is None:
+                    candidates = entity_registry.async_entries_for_config_entry(self._registry, config_entry.entry_id)
+                else:
+                    removed = {person.get("name", "").lower() for person in get_records(old_data, CONF_BIRTHDAYS).values()} - person_names
+                    candidates = [e for name in removed for e in self._lookup("birthday", name) if e.config_entry_id == config_entry.entry_id]
+
+                for entity in candidates:
                     if "月相" in entity.unique_id: continue
                     if ("birthday_" in entity.unique_id or "event_" in entity.unique_id):
-                        base_name = ""
-                        if "_" in entity.unique_id:
-                            prefix, name, type = self._get_entity_parts(entity.unique_id)
-                            if name: base_name = name
-                            
-                        found = False
-                        for i in range(1, MAX_BIRTHDAYS + 1):
-                            if config_entry.data.get(f"person{i}_name", "").lower() == base_name:
-                                found = True
-                                if entity.unique_id in preserved_entities:
-                                    self._entities[entity.unique_id] = preserved_entities[entity.unique_id]
-                                break
-                        
-                        if not found:
-                            prefix, name, type = self._get_entity_parts(entity.unique_id)
-                            if name and type:
-                                matching_entities = self._get_entity_by_base_id(all_registry, name, type)
-                                active_entities = [e for e in matching_entities if e != entity and e.disabled_by is None]
-                                
-                                if not active_entities:
-                                    if any(matching.unique_id in preserved_entities for matching in matching_entities):
-                                        continue
-                                    await self._remove_entity(entity.entity_id, entity.unique_id)
+                        prefix, name, type = self._get_entity_parts(entity.unique_id)
+                        if name and name in person_names:
+                            if entity.disabled_by is None:
+                                self._entities[entity.unique_id] = entity.entity_id
+                            continue
+
+                        if name and type:
+                            matching_entities = self._lookup("birthday", name, type)
+                            active_entities = [e for e in matching_entities if e != entity and e.disabled_by is None]
+
+                            if not active_entities:
+                                if any(m.config_entry_id == config_entry.entry_id and m.disabled_by is None for m in matching_entities):
+                                    continue
+                                await self._remove_entity(entity.entity_id, entity.unique_id)
             except Exception as e:
                 raise RuntimeError(f"清理失败: {str(e)}") from e
 
@@ -139,13 +185,11 @@ class RegistryManager:
     async def _get_valid_entities(self, config_entry: ConfigEntry) -> Set[str]:
         valid_entities = set()
         if config_entry.data.get(CONF_BIRTHDAY_ENABLED):
-            for i in range(1, MAX_BIRTHDAYS + 1):
-                name = config_entry.data.get(f"person{i}_name")
-                if name: valid_entities.add(f"birthday_{name.lower()}_{i}")
+            for i, person in enumerate(get_records(config_entry.data, CONF_BIRTHDAYS).values(), 1):
+                if name := person.get("name"): valid_entities.add(f"birthday_{name.lower()}_{i}")
         if config_entry.data.get(CONF_EVENT_ENABLED):
-            for i in range(1, MAX_EVENTS + 1):
-                name = config_entry.data.get(f"event{i}_name")
-                if name: valid_entities.add(f"event_{name.lower()}_{i}")
+            for i, event in enumerate(get_records(config_entry.data, CONF_EVENTS).values(), 1):
+                if name := event.get("name"): valid_entities.add(f"event_{name.lower()}_{i}")
         return valid_entities
 
     async def cleanup_all_entities(self, config_entry: ConfigEntry) -> None:
@@ -227,17 +271,23 @@ async def setup_almanac_card(hass: HomeAssistant) -> bool:
     add_extra_js_url(hass, f"{card_path}/almanac-card.js?ver={version}")
     return True
 
+@timed_setup
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     hass.data[DOMAIN] = {}
+    await async_setup_almanac_table(hass)
     await setup_almanac_card(hass)
     await async_setup_date_service(hass)
     hass.http.register_view(AlmanacAPIView())
+    hass.http.register_view(UpcomingAPIView())
     return True
 
+@timed_setup
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: Optional[AddEntitiesCallback] = None) -> bool:
     try:
         if DOMAIN not in hass.data:
             hass.data[DOMAIN] = {}
+
+        await async_preload_converter(hass, entry.data.get("language", "auto"))
         
         if "intents_registered" not in hass.data[DOMAIN]:
             from .intent import async_setup_intents
@@ -251,7 +301,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
         almanac_coordinator = AlmanacCoordinator(hass, entry)
         hass.data[DOMAIN][entry.entry_id] = {
             "almanac": almanac_coordinator,
-            "config": dict(entry.data)
+            "config": dict(entry.data),
+            "records": RecordIndex(entry.data, dt_util.now().date())
         }
         
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -260,24 +311,38 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     except Exception as e:
         raise ConfigEntryNotReady from e
 
+def _record_names(config: dict, kind: str) -> dict:
+    return {rid: record.get("name") for rid, record in get_records(config, kind).items()}
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    if entry.version == 1:
+        hass.config_entries.async_update_entry(entry, data=migrate_flat_records(dict(entry.data)), version=2)
+    return True
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     try:
+        from .almanac_sensor import AlmanacSensor
+        AlmanacSensor._shared_lunar_cache.resize(entry.options.get(CONF_LUNAR_CACHE_SIZE, entry.data.get(CONF_LUNAR_CACHE_SIZE, DEFAULT_LUNAR_CACHE_SIZE)))
         if entry_data := hass.data[DOMAIN].get(entry.entry_id):
             old_config = dict(entry_data.get("config", {}))
             new_config = dict(entry.data)
+            entry_data["records"].update(new_config)
+
+            if await async_reconcile_entities(hass, entry, old_config, new_config):
+                entry_data["config"] = new_config
+                if registry_manager := hass.data[DOMAIN].get("registry_manager"):
+                    await registry_manager.cleanup_orphaned_entities(entry, old_config)
+                return
 
             need_reload = (
                 old_config.get(CONF_BIRTHDAY_ENABLED) != new_config.get(CONF_BIRTHDAY_ENABLED) or
                 old_config.get(CONF_EVENT_ENABLED) != new_config.get(CONF_EVENT_ENABLED) or
-                any(old_config.get(f"person{i}_name") != new_config.get(f"person{i}_name")
-                    for i in range(1, MAX_BIRTHDAYS + 1)) or
-                any(old_config.get(f"event{i}_name") != new_config.get(f"event{i}_name")
-                    for i in range(1, MAX_EVENTS + 1))
+                any(_record_names(old_config, kind) != _record_names(new_config, kind)
+                    for kind in (CONF_BIRTHDAYS, CONF_EVENTS))
             )
-
             if need_reload:
                 if registry_manager := hass.data[DOMAIN].get("registry_manager"):
-                    await registry_manager.cleanup_orphaned_entities(entry)
+                    await registry_manager.cleanup_orphaned_entities(entry, old_config)
 
                 entry_data["config"] = new_config
                 await hass.config_entries.async_reload(entry.entry_id)
@@ -306,14 +371,23 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             if coordinator:
                 await coordinator.async_close()
             hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN].get("registered_names", {}).pop(entry.entry_id, None)
+        if not any(isinstance(v, dict) and "records" in v for v in hass.data[DOMAIN].values()):
+            shutdown_ai_clients(hass)
         
         if not hass.config_entries.async_entries(DOMAIN):
             if SERVICE_DATE_CONTROL in (hass.services.async_services().get(DOMAIN) or {}):
                 hass.services.async_remove(DOMAIN, SERVICE_DATE_CONTROL)
+            if registry_manager := hass.data[DOMAIN].get("registry_manager"):
+                registry_manager.shutdown()
             hass.data.pop(DOMAIN, None)
             
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    from .birthday_manager import BirthdayStateStore
+    await BirthdayStateStore(hass, entry.entry_id).async_remove()
+
 async def export_almanac_data(hass: HomeAssistant, entry_id: str = None) -> dict:
     if DOMAIN not in hass.data or "almanac_sensors" not in hass.data[DOMAIN]:
         return {"error": "未找到老黄历数据"}
@@ -327,7 +401,8 @@ async def export_almanac_data(hass: HomeAssistant, entry_id: str = None) -> dict
         for s_list in sensors.values():
             all_sensors.extend(s_list)
         sensor_list = all_sensors
-    result = {"timestamp": datetime.now().isoformat(), "data": {}}
+    from .almanac_sensor import AlmanacSensor
+    result = {"timestamp": datetime.now().isoformat(), "data": {}, "lunar_cache": AlmanacSensor._shared_lunar_cache.stats, "setup_timing": hass.data[DOMAIN].get("setup_timing", {})}
     for sensor in sensor_list:
         if sensor._cleanup_called or not sensor._available:
             continue
@@ -340,10 +415,52 @@ async def export_almanac_data(hass: HomeAssistant, entry_id: str = None) -> dict
 class AlmanacAPIView(HomeAssistantView):
     url = "/api/chinese_calendar/data"
     name = "api:chinese_calendar:data"
+    # The plain export has always been public; only the start=/date= query modes require a token.
     requires_auth = False
     
     async def get(self, request):
         hass = request.app["hass"]
+        if ("start" in request.query or "date" in request.query) and not request.get(KEY_AUTHENTICATED, False):
+            return web.json_response({"error": "未授权"}, status=401)
+        if start := request.query.get("start"):
+            try:
+                fields = [f for f in request.query.get("fields", "").split(",") if f] or None
+                hour = int(request.query["hour"]) if "hour" in request.query else None
+                data = await async_query_almanac_range(
+                    hass,
+                    date.fromisoformat(start),
+                    date.fromisoformat(request.query.get("end", start)),
+                    fields,
+                    hour,
+                    request.query.get("attributes") in ("1", "true"),
+                )
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+            return web.json_response(data)
+        if query_date := request.query.get("date"):
+            try:
+                when = datetime.combine(date.fromisoformat(query_date), dt_util.as_local(dt_util.now()).replace(tzinfo=None).time())
+                data = await async_query_almanac(hass, when)
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+            return web.json_response({"date": query_date, "data": data})
         entry_id = request.query.get("entry_id")
         data = await export_almanac_data(hass, entry_id)
         return web.json_response(data)
+
+class UpcomingAPIView(HomeAssistantView):
+    url = "/api/chinese_calendar/upcoming"
+    name = "api:chinese_calendar:upcoming"
+    requires_auth = True
+
+    async def get(self, request):
+        hass = request.app["hass"]
+        try:
+            start = date.fromisoformat(request.query["start"]) if "start" in request.query else None
+            days = int(request.query.get("days", 30))
+            limit = int(request.query["limit"]) if "limit" in request.query else None
+            kinds = [k for k in request.query.get("kinds", "").split(",") if k] or None
+            data = await async_query_upcoming(hass, start, days, limit, kinds)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(data)
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import date, timedelta
+from typing import Optional
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+from .const import DOMAIN, AI_TIMEOUT, AI_CONCURRENCY, AI_RETRIES, AI_BACKOFF, AI_CACHE_DAYS, AI_BATCH_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+AI_CACHE_VERSION = 1
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_JSON_OBJECT = re.compile(r"\{.*\}", re.S)
+
+
+class AIRequestError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AIResponseCache:
+    """Answers kept in .storage by (person, date, model, prompt hash), so a restart does not pay for the same day twice."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, AI_CACHE_VERSION, f"{DOMAIN}.ai_cache")
+        self._data: Optional[dict] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def key(person: str, day: date, model: str, prompt: str) -> str:
+        return f"{person}|{day.isoformat()}|{model}|{hashlib.sha1(prompt.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def _oldest() -> str:
+        return (dt.now().date() - timedelta(days=AI_CACHE_DAYS)).isoformat()
+
+    async def _async_load(self) -> dict:
+        async with self._lock:
+            if self._data is None:
+                data = await self._store.async_load() or {}
+                oldest = self._oldest()
+                self._data = {k: v for k, v in data.items() if v.get("date", "") >= oldest}
+            return self._data
+
+    async def async_get(self, key: str) -> Optional[str]:
+        return (await self._async_load()).get(key, {}).get("content")
+
+    async def async_set(self, key: str, day: date, content: str) -> None:
+        data = await self._async_load()
+        oldest = self._oldest()
+        for stale in [k for k, v in data.items() if v.get("date", "") < oldest]:
+            del data[stale]
+        data[key] = {"date": day.isoformat(), "content": content}
+        self._store.async_delay_save(lambda: self._data, 10)
+
+
+class AIClient:
+    """OpenAI-compatible chat client for one endpoint.
+
+    Requests share one pooled keep-alive session, at most AI_CONCURRENCY run at once, and
+    connection errors, timeouts, 429 and 5xx responses are retried with exponential backoff.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, url: str, api_key: str, cache: Optional[AIResponseCache] = None,
+                 concurrency: int = AI_CONCURRENCY, retries: int = AI_RETRIES, backoff: float = AI_BACKOFF):
+        self._session = session
+        self._url = f"{url.rstrip('/')}/v1/chat/completions"
+        self._headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        self._cache = cache
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._retries = retries
+        self._backoff = backoff
+        self._batches = {}
+        self._flushes = set()
+
+    async def _async_post(self, payload: dict) -> dict:
+        try:
+            async with self._session.post(self._url, headers=self._headers, json=payload, timeout=aiohttp.ClientTimeout(total=AI_TIMEOUT)) as response:
+                if response.status in _RETRY_STATUS:
+                    retry_after = response.headers.get("Retry-After", "")
+                    raise AIRequestError(f"HTTP {response.status}", float(retry_after) if retry_after.isdigit() else None)
+                if response.status != 200:
+                    raise ValueError(f"HTTP {response.status}")
+                return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AIRequestError(str(e) or type(e).__name__) from e
+
+    async def async_chat(self, model: str, prompt: str, max_tokens: int = 500) -> Optional[str]:
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": 0.7, "max_tokens": max_tokens}
+        for attempt in range(self._retries + 1):
+            try:
+                async with self._semaphore:
+                    result = await self._async_post(payload)
+                return result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            except AIRequestError as e:
+                if attempt == self._retries:
+                    _LOGGER.warning(f"AI接口调用失败: {e}")
+                    return None
+                await asyncio.sleep(e.retry_after if e.retry_after is not None else self._backoff * 2 ** attempt)
+            except (ValueError, KeyError, IndexError, AttributeError) as e:
+                _LOGGER.warning(f"AI接口返回异常: {e}")
+                return None
+        return None
+
+    async def async_complete(self, model: str, prompt: str, person: Optional[str] = None, day: Optional[date] = None, max_tokens: int = 500) -> Optional[str]:
+        """Chat completion, answered from the persistent cache when `person` already asked this prompt on `day`."""
+        key = AIResponseCache.key(person, day, model, prompt) if self._cache and person and day else None
+        if key and (cached := await self._cache.async_get(key)) is not None:
+            return cached
+        content = await self.async_chat(model, prompt, max_tokens)
+        if key and content:
+            await self._cache.async_set(key, day, content)
+        return content
+
+
+    async def async_complete_batched(self, model: str, prompt: str, person: str, day: date, header: str, request: str, footer: str,
+                                     max_tokens: int = 500, window: float = AI_BATCH_WINDOW) -> Optional[str]:
+        """Like `async_complete`, but requests for the same model and header that arrive within `window` seconds share one call.
+
+        `request` describes this person inside the combined prompt; `prompt` is the stand-alone prompt that
+        serves as cache key and as fallback when the combined answer does not cover this person.
+        """
+        key = AIResponseCache.key(person, day, model, prompt) if self._cache else None
+        if key and (cached := await self._cache.async_get(key)) is not None:
+            return cached
+        group = (model, day, header, footer)
+        if (batch := self._batches.get(group)) is None:
+            batch = self._batches[group] = {}
+            task = asyncio.get_running_loop().create_task(self._async_flush(group, window, max_tokens))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        future = batch.setdefault(person, (request, prompt, asyncio.get_running_loop().create_future()))[2]
+        content = await future
+        if key and content:
+            await self._cache.async_set(key, day, content)
+        return content
+
+    async def _async_flush(self, group: tuple, window: float, max_tokens: int) -> None:
+        await asyncio.sleep(window)
+        model, _, header, footer = group
+        batch = self._batches.pop(group)
+        answers = {}
+        try:
+            if len(batch) > 1:
+                labels = {f"p{i}": person for i, person in enumerate(batch, 1)}
+                lines = "\n".join(f"{label}：{batch[person][0]}" for label, person in labels.items())
+                combined = f"{header}\n{lines}\n{footer}\n请只输出一个JSON对象，键为上面的编号（{'、'.join(labels)}），值为对应的预测文本，不要输出其他内容。"
+                answers = {labels[k]: v for k, v in parse_batch_answer(await self.async_chat(model, combined, max_tokens * len(batch))).items() if k in labels}
+            missing = [person for person in batch if not answers.get(person)]
+            if missing:
+                if len(batch) > 1:
+                    _LOGGER.debug(f"AI批量结果缺少{len(missing)}人，改为逐个请求")
+                for person, content in zip(missing, await asyncio.gather(*(self.async_chat(model, batch[p][1], max_tokens) for p in missing))):
+                    answers[person] = content
+        except Exception as e:
+            _LOGGER.warning(f"AI批量请求失败: {e}")
+        finally:
+            for person, (_, _, future) in batch.items():
+                if not future.done():
+                    future.set_result(answers.get(person))
+
+
+    def shutdown(self) -> None:
+        """Cancel pending batch flushes and fail the requests still waiting on them."""
+        for task in self._flushes:
+            task.cancel()
+        self._flushes.clear()
+        for batch in self._batches.values():
+            for _, _, future in batch.values():
+                if not future.done():
+                    future.set_exception(AIRequestError("AI客户端已关闭"))
+        self._batches.clear()
+
+
+def parse_batch_answer(content: Optional[str]) -> dict:
+    """{label: text} from a batched answer; tolerates code fences and prose around the JSON object."""
+    if not content or not (match := _JSON_OBJECT.search(content)):
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    return {str(k): v.strip() for k, v in data.items() if isinstance(v, str) and v.strip()} if isinstance(data, dict) else {}
+
+
+def get_ai_client(hass: HomeAssistant, url: str, api_key: str) -> AIClient:
+    """Shared client per (endpoint, key), so every person on one endpoint uses the same pool and concurrency limit."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (cache := domain_data.get("ai_cache")) is None:
+        cache = domain_data["ai_cache"] = AIResponseCache(hass)
+    clients = domain_data.setdefault("ai_clients", {})
+    if (client := clients.get((url, api_key))) is None:
+        client = clients[(url, api_key)] = AIClient(async_get_clientsession(hass), url, api_key, cache)
+    return client
+
+
+def shutdown_ai_clients(hass: HomeAssistant) -> None:
+    for client in hass.data.get(DOMAIN, {}).pop("ai_clients", {}).values():
+        client.shutdown()
@@ -0,0 +1,310 @@
+import logging,asyncio,re
+from collections import OrderedDict
+from datetime import datetime,timedelta
+
+_LOGGER = logging.getLogger(__name__)
+
+def load_cnlunar():
+    """Import cnlunar on first use so that loading the integration does not pay for it up front."""
+    import cnlunar # pyright: ignore[reportMissingImports]
+    return cnlunar
+
+def new_lunar(when): return load_cnlunar().Lunar(when,godType='8char')
+
+class TextProcessor:
+    _FILTERS={'上表章','上册','颁诏','修置产室','举正直','选将','宣政事','冠带','上官','临政','竖柱上梁','修仓库','营建','穿井','伐木','畋猎','招贤','酝酿','乘船渡水','解除','缮城郭','筑堤防','修宫室','安碓硙','纳采','针刺','平治道涂','裁制','修饰垣墙','塞穴','庆赐','破屋坏垣','鼓铸','启攒','开仓','纳畜','牧养','经络','安抚边境','选将','布政事','覃恩','雪冤','出师'}
+    _TEXT_PATTERN=re.compile(r'\[.*?\]|[,;，；]')
+    @staticmethod
+    def clean_text(text):
+        zodiac_chars={'鼠','牛','虎','兔','龙','蛇','马','羊','猴','鸡','狗','猪','建','除','满','平','定','执','破','危','成','收','开','闭'}
+        blacklist_pattern=re.compile(r'黄道|黑道|日|-|、|(?<!^)开')
+        filtered_text=blacklist_pattern.sub('',text)
+        words=[w for w in TextProcessor._TEXT_PATTERN.sub(' ',filtered_text).split() if(len(w)>1 or w in zodiac_chars)and w not in TextProcessor._FILTERS]
+        return ' '.join(words[:10]).strip()
+    @staticmethod
+    def format_lucky_gods(data): return ' '.join(data) if isinstance(data,list) else ' '.join(f"{k}:{v}" for k,v in data.items()) if isinstance(data,dict) else str(data)
+    @staticmethod
+    def format_dict(data): return ' '.join(f"{k}{v}" for k,v in data.items()) if isinstance(data,dict) else str(data)
+def calc_level_name(good_count, bad_count):
+    r = good_count / max(bad_count, 1)
+    if r >= 3.0: return '上上：吉神云集，诸事皆宜，百无禁忌。'
+    if r >= 2.0: return '上：吉足胜凶，从宜不从忌。何患其之忧。'
+    if r >= 1.5: return '上次：吉足抵凶，遇德从宜不从忌，不遇从宜亦从忌。'
+    if r >= 1.0: return '中上：吉凶相当，遇德从宜，不遇慎行之。'
+    if r >= 0.8: return '中：吉不抵凶，遇德从宜不从忌，不遇从忌不从宜。'
+    if r >= 0.5: return '中次：凶胜于吉，遇德从宜亦从忌，不遇从忌不从宜。'
+    if r >= 0.3: return '下：凶又逢凶，遇德从忌不从宜，不遇诸事皆忌。'
+    return '下下：凶煞肆虐，诸事不宜，宜静守勿动之也。'
+
+class TimeHelper:
+    SHICHEN=('子时','丑时','寅时','卯时','辰时','巳时','午时','未时','申时','酉时','戌时','亥时')
+    MARKS=('初','一','二','三','四','五','六','七')
+    TIME_RANGES=('23-01','01-03','03-05','05-07','07-09','09-11','11-13','13-15','15-17','17-19','19-21','21-23')
+    @staticmethod
+    def get_current_shichen(h,m):i=0 if h==23 else(h+1)//2%12;start_hour=23 if h==23 else(h//2)*2+1;total_mins=(h-start_hour)*60+m;k=total_mins//15;return f"{TimeHelper.SHICHEN[i]}{'初' if k==0 else TimeHelper.MARKS[min(7,k)]}刻"
+    @staticmethod
+    def get_current_twohour(h):return 11 if h==23 else((h+1)//2)%12
+    @staticmethod
+    def format_twohour_lucky(l, t):
+        i = TimeHelper.get_current_twohour(t.hour)
+        return {
+            'state': f"{TimeHelper.TIME_RANGES[i]} {l[i]}",
+            'attributes': dict(zip(TimeHelper.TIME_RANGES, l))
+        }
+
+ALMANAC_TYPES = ['日期','农历','星期','今日节日','周数','八字','节气','季节','时辰凶吉','生肖冲煞','星座','星次','彭祖百忌','十二神','廿八宿','今日三合','今日六合','纳音','九宫飞星','吉神方位','今日胎神','今日吉神','今日凶煞','宜忌等第','宜','忌','时辰经络','时辰','六曜','日禄','三十六禽','六十四卦','盲派']
+
+FIELD_GRANULARITY = {**{t:'day' for t in ALMANAC_TYPES},'时辰':'quarter','时辰凶吉':'shichen','时辰经络':'shichen','盲派':'shichen','八字':'shichen'}
+
+def granularity_key(granularity,now):
+    """Bucket of `now` for a granularity; a field only needs recomputing when its bucket changes.
+    Solar-term and lunar-month fields use 'day': their boundaries fall on day boundaries, and 23:00 counts
+    as its own bucket because cnlunar moves the day pillar forward at 子初."""
+    if granularity=='quarter':return (now.date(),now.hour,now.minute//15)
+    if granularity=='shichen':return (now.date(),(now.hour+1)//2)
+    return (now.date(),now.hour==23)
+
+def process_solar_terms(solar_terms_dict,current_month,current_day):
+    terms=sorted(solar_terms_dict.items(),key=lambda x:(x[1][0],x[1][1]))
+    for i,(term,(month,day)) in enumerate(terms):
+        if i==len(terms)-1 and(month<current_month or(month==current_month and day<=current_day)): return term,terms[0][0],f"{terms[0][1][0]}月{terms[0][1][1]}日"
+        elif((month<current_month)or(month==current_month and day<=current_day))and((terms[i+1][1][0]>current_month)or(terms[i+1][1][0]==current_month and terms[i+1][1][1]>current_day)): return term,terms[i+1][0],f"{terms[i+1][1][0]}月{terms[i+1][1][1]}日"
+        elif i==0 and(month>current_month or(month==current_month and day>current_day)): return terms[-1][0],term,f"{month}月{day}日"
+    return"","",""
+
+DAY_RECORD_FIELDS = ('lunarYear','lunarMonth','lunarDay','isLunarLeapMonth','lunarMonthCn','lunarDayCn','year8Char','month8Char','day8Char','chineseYearZodiac','weekDayCn','lunarSeason','chineseZodiacClash','starZodiac','todayEastZodiac','holidays','term','next_term','next_date','彭祖百忌','十二神','廿八宿','今日三合','今日六合','纳音','nine_numbers','吉神方位','今日胎神','今日吉神','今日凶煞','宜忌等第','宜','忌','六曜','日禄','三十六禽','twohour_lucky','twohour_8char')
+INT_RECORD_FIELDS = ('lunarYear','lunarMonth','lunarDay','isLunarLeapMonth')
+
+def build_day_record(lunar_data):
+    """Extract the day-level inputs of a snapshot from a cnlunar.Lunar; valid for every hour that shares its day pillar."""
+    tp=TextProcessor
+    date=lunar_data.date
+    term,next_term,next_date=process_solar_terms(lunar_data.thisYearSolarTermsDic,date.month,date.day)
+    stem,branch=lunar_data.day8Char[0],lunar_data.day8Char[1]
+    BL={'甲':'寅','乙':'卯','丙':'巳','戊':'巳','丁':'午','己':'午','庚':'申','辛':'酉','壬':'亥','癸':'子'}
+    SG={'甲':('寅','卯'),'乙':('卯','辰'),'丙':('巳','午'),'戊':('巳','午'),'丁':('午','未'),'己':('午','未'),'庚':('申','酉'),'辛':('酉','戌'),'壬':('亥','子'),'癸':('子','丑')}
+    luck_pos=BL.get(stem,'')
+    day_fortune=f"{branch}命进禄"if branch==luck_pos else f"{branch}命互禄"if branch in SG.get(stem,())else f"{stem}命进{luck_pos}禄"
+    animals={"子":["貔貅","天鼠","天貂"],"丑":["獬豸","天牛","蛟龙"],"寅":["天马","天虎","天狗"],"卯":["天兔","天狐","天獐"],"辰":["螭吻","天龙","天麟"],"巳":["天蛇","天蜥","天鳖"],"午":["天马","天驴","天鹿"],"未":["天羊","天鸟","天獝"],"申":["猴王","天猴","天猿"],"酉":["天鸡","天燕","天乌"],"戌":["天狗","天狼","山犭"],"亥":["天猪","天豕","天彘"]}
+    stems=["甲","乙","丙","丁","戊","己","庚","辛","壬","癸"]
+    return {
+        'lunarYear': lunar_data.lunarYear,
+        'lunarMonth': lunar_data.lunarMonth,
+        'lunarDay': lunar_data.lunarDay,
+        'isLunarLeapMonth': int(lunar_data.isLunarLeapMonth),
+        'lunarMonthCn': lunar_data.lunarMonthCn,
+        'lunarDayCn': lunar_data.lunarDayCn,
+        'year8Char': lunar_data.year8Char,
+        'month8Char': lunar_data.month8Char,
+        'day8Char': lunar_data.day8Char,
+        'chineseYearZodiac': lunar_data.chineseYearZodiac,
+        'weekDayCn': lunar_data.weekDayCn,
+        'lunarSeason': lunar_data.lunarSeason,
+        'chineseZodiacClash': lunar_data.chineseZodiacClash,
+        'starZodiac': lunar_data.starZodiac,
+        'todayEastZodiac': lunar_data.todayEastZodiac,
+        'holidays': lunar_data.get_legalHolidays()+lunar_data.get_otherHolidays()+lunar_data.get_otherLunarHolidays(),
+        'term': term,
+        'next_term': next_term,
+        'next_date': next_date,
+        '彭祖百忌': tp.clean_text(''.join(lunar_data.get_pengTaboo(long=4, delimit=' '))),
+        '十二神': tp.clean_text(' '.join(lunar_data.get_today12DayOfficer())),
+        '廿八宿': tp.clean_text(''.join(lunar_data.get_the28Stars())),
+        '今日三合': tp.clean_text(' '.join(lunar_data.zodiacMark3List)),
+        '今日六合': lunar_data.zodiacMark6,
+        '纳音': lunar_data.get_nayin(),
+        'nine_numbers': tp.clean_text(tp.format_dict(lunar_data.get_the9FlyStar())),
+        '吉神方位': tp.format_lucky_gods(lunar_data.get_luckyGodsDirection()),
+        '今日胎神': lunar_data.get_fetalGod(),
+        '今日吉神': tp.clean_text(' '.join(lunar_data.goodGodName)),
+        '今日凶煞': tp.clean_text(' '.join(lunar_data.badGodName)),
+        '宜忌等第': lunar_data.todayLevelName if lunar_data.todayLevelName and lunar_data.todayLevelName != '无' else calc_level_name(len(lunar_data.goodGodName), len(lunar_data.badGodName)),
+        '宜': tp.clean_text(' '.join(lunar_data.goodThing)) or "暂无",
+        '忌': tp.clean_text(' '.join(lunar_data.badThing)) or "暂无",
+        '六曜': ("大安", "赤口", "先胜", "友引", "先负", "空亡")[(lunar_data.lunarMonth+lunar_data.lunarDay)%6],
+        '日禄': day_fortune,
+        '三十六禽': animals[branch][stems.index(stem)%3]if branch in animals else"未知",
+        'twohour_lucky': ''.join(lunar_data.get_twohourLuckyList()[:12]),
+        'twohour_8char': ''.join(lunar_data.twohour8CharList[:12]),
+    }
+
+def snapshot_from_record(record,now,get_holiday):
+    """Derive every field for one (date, hour) from a day record as {type: (state, attributes)}; 时辰 is per quarter and stays on the sensor."""
+    formatted_date=now.strftime('%Y-%m-%d')
+    twohour=TimeHelper.get_current_twohour(now.hour)
+    nine_numbers=record['nine_numbers']
+    center_num = nine_numbers[5] if len(nine_numbers) == 9 else '5'
+    gods = {'1':'贪狼星','2':'巨门星','3':'禄存星','4':'文曲星','5':'廉贞星','6':'武曲星','7':'破军星','8':'左辅星','9':'右弼星'}
+    star_names = {'1':'一白','2':'二黑','3':'三碧','4':'四绿','5':'五黄','6':'六白','7':'七赤','8':'八白','9':'九紫'}
+    numbers = f"{gods[center_num]} {star_names[center_num]}"
+    nine_palace_attrs={}
+    if nine_numbers.isdigit() and len(nine_numbers)==9:
+        P=('西北乾','北坎','东北艮','西兑','中宫','东震','西南坤','南离','东南巽')
+        PS=('西北','正北','东北','正西','中宫','正东','西南','正南','东南')
+        SC={'1':'白','2':'黑','3':'碧','4':'绿','5':'黄','6':'白','7':'赤','8':'白','9':'紫'}
+        nine_palace_attrs.update({s:f"{p}{n}{SC[n]}"for s,p,n in zip(PS,P,nine_numbers)if n in SC})
+    stem,branch=record['day8Char'][0],record['day8Char'][1]
+    lunar_month=record['lunarMonth']
+    meridians = ['足少阳胆','足厥阴肝','手太阴肺', '手阳明大肠', '足阳明胃', '足太阴脾', '手少阴心', '手太阳小肠', '足太阳膀胱', '足少阴肾', '手厥阴心包', '手少阳三焦']
+    hour_8char=record['twohour_8char'][((now.hour+1)//2)%12*2:][:2]
+    y,m,d=max(1,abs(now.year)),max(1,min(12,abs(now.month))),max(1,abs(now.day))
+    d_idx=((d-1)%6)+1
+    y_idx=(y-1)%8
+    m_idx=(m-1)%8
+    BASE_GUA=(("坤卦","艮卦","坎卦","巽卦","震卦","离卦","兑卦","乾卦"),("剥卦","艮卦","蹇卦","渐卦","小过卦","旅卦","咸卦","遁卦"),("比卦","蒙卦","坎卦","节卦","屯卦","既济卦","革卦","需卦"),("观卦","渐卦","节卦","巽卦","益卦","家人卦","涣卦","姤卦"),("豫卦","小过卦","屯卦","益卦","震卦","丰卦","归妹卦","大壮卦"),("晋卦","旅卦","既济卦","家人卦","丰卦","离卦","睽卦","同人卦"),("萃卦","咸卦","革卦","涣卦","归妹卦","睽卦","兑卦","夬卦"),("否卦","遁卦","需卦","姤卦","大壮卦","同人卦","夬卦","乾卦"))
+    yao_up=d_idx>3
+    change_y=(y_idx+(d_idx-1))%8 if not yao_up else y_idx
+    change_m=(m_idx+(d_idx-1))%8 if yao_up else m_idx
+    iching_result=f"{BASE_GUA[y_idx][m_idx]}=>{BASE_GUA[change_y][change_m]}"
+    blind_result='、'.join(x for x,r in ([y for y in [('贵人日',TimeHelper.SHICHEN[twohour][0] in {'甲':['丑','未'],'戊':['丑','未'],'乙':['子','申'],'己':['子','申'],'丙':['亥','酉'],'丁':['亥','酉'],'壬':['巳','卯'],'癸':['巳','卯'],'庚':['寄','午'],'辛':['寅','午']}.get(stem,[])),('青龙日',any([
+        lunar_month in [1,7] and stem in ['甲'],
+        lunar_month in [2,8] and stem in ['乙'],
+        lunar_month in [3,9] and stem in ['丙'],
+        lunar_month in [4,10] and stem in ['丁'],
+        lunar_month in [5,11] and stem in ['戊'],
+        lunar_month in [6,12] and stem in ['己']
+    ])),('五不遇时',TimeHelper.SHICHEN[twohour][0]==({'甲':'午','乙':'巳','丙':'辰','丁':'卯','戊':'寅','己':'亥','庚':'子','辛':'酉','壬':'申','癸':'未'}).get(stem))] if y[1]] or [y for y in [('大红沙日',any([lunar_month in [1,2,3] and branch in ['戌','子'],lunar_month in [4,5,6] and branch in ['辰','巳'],lunar_month in [7,8,9] and branch in ['午','未'],lunar_month in [10,11,12] and branch in ['申','戌']])),('小红沙日',any([lunar_month in [1,4,7,10] and branch=='巳',lunar_month in [2,5,8,11] and branch=='酉',lunar_month in [3,6,9,12] and branch=='丑'])),('天地大重丧',branch in ['巳','亥']),('不利葬',any([lunar_month in [1,7] and stem in ['庚','甲'],lunar_month in [2,8] and stem in ['乙','辛'],lunar_month in [5,11] and stem in ['丁','癸'],lunar_month in [4,10] and stem in ['丙','壬'],lunar_month in [3,6,9,12] and stem in ['戊','己']])),('三丧日',{'spring':'辰','summer':'未','autumn':'戌','winter':'丑'}.get(next(iter([k for k,v in {'spring':[1,2,3],'summer':[4,5,6],'autumn':[7,8,9],'winter':[10,11,12]}.items() if lunar_month in v]),''))==branch)] if y[1]]) if r) or '寻穴日'
+    lucky=TimeHelper.format_twohour_lucky(list(record['twohour_lucky']), now)
+    state_map = {
+        '日期': formatted_date,
+        '农历': f"{record['year8Char']}({record['chineseYearZodiac']})年 {record['lunarMonthCn']}{record['lunarDayCn']}",
+        '星期': record['weekDayCn'],
+        '周数': f"{now.isocalendar()[1]}周",
+        '今日节日': get_holiday(formatted_date, record['holidays']),
+        '八字': f"{record['year8Char']} {record['month8Char']} {record['day8Char']} {hour_8char}",
+        '节气': record['term'],
+        '季节': record['lunarSeason'],
+        '时辰凶吉': lucky['state'],
+        '生肖冲煞': record['chineseZodiacClash'],
+        '星座': record['starZodiac'],
+        '星次': record['todayEastZodiac'],
+        '彭祖百忌': record['彭祖百忌'],
+        '十二神': record['十二神'],
+        '廿八宿': record['廿八宿'],
+        '今日三合': record['今日三合'],
+        '今日六合': record['今日六合'],
+        '纳音': record['纳音'],
+        '九宫飞星': numbers,
+        '吉神方位': record['吉神方位'],
+        '今日胎神': record['今日胎神'],
+        '今日吉神': record['今日吉神'],
+        '今日凶煞': record['今日凶煞'],
+        '宜忌等第': record['宜忌等第'],
+        '宜': record['宜'],
+        '忌': record['忌'],
+        '时辰经络': meridians[twohour],
+        '六曜': record['六曜'],
+        '日禄': record['日禄'],
+        '三十六禽': record['三十六禽'],
+        '六十四卦': iching_result,
+        '盲派': blind_result
+    }
+    attributes_map = {'时辰凶吉': lucky['attributes']}
+    if nine_palace_attrs: attributes_map['九宫飞星'] = nine_palace_attrs
+    if record['next_term'] and record['next_date']: attributes_map['节气'] = {"下一节气": f"{record['next_term']} ({record['next_date']})"}
+    return {k: (v, attributes_map.get(k, {})) for k, v in state_map.items()}
+
+def build_snapshot(lunar_data,now,get_holiday):
+    return snapshot_from_record(build_day_record(lunar_data),now,get_holiday)
+
+class LunarCache:
+    """Bounded LRU of cnlunar.Lunar objects keyed by '%Y-%m-%d_%H'; today's entries are pinned and never evicted."""
+    def __init__(self, capacity):
+        self._capacity=max(1,int(capacity))
+        self._data=OrderedDict()
+        self.hits=self.misses=self.evictions=0
+
+    def __contains__(self, key): return key in self._data
+    def __len__(self): return len(self._data)
+
+    def get(self, key):
+        if (value:=self._data.get(key)) is None:self.misses+=1;return None
+        self._data.move_to_end(key);self.hits+=1
+        return value
+
+    def put(self, key, value):
+        self._data[key]=value;self._data.move_to_end(key)
+        self._evict()
+
+    def resize(self, capacity):
+        self._capacity=max(1,int(capacity));self._evict()
+
+    def clear(self): self._data.clear()
+
+    def _evict(self):
+        if len(self._data)<=self._capacity:return
+        today=datetime.now().strftime('%Y-%m-%d')
+        for key in [k for k in self._data if not k.startswith(today)]:
+            if len(self._data)<=self._capacity:break
+            del self._data[key];self.evictions+=1
+
+    @property
+    def stats(self):
+        lookups=self.hits+self.misses
+        return {"size":len(self._data),"capacity":self._capacity,"hits":self.hits,"misses":self.misses,"evictions":self.evictions,"hit_rate":round(self.hits/lookups,4) if lookups else 0.0}
+
+class LunarLoader:
+    """Builds cnlunar.Lunar objects in the executor; concurrent requests for the same hour share one computation."""
+    def __init__(self, cache):
+        self.cache=cache
+        self._inflight={}
+
+    async def async_get(self, when):
+        key=when.strftime('%Y-%m-%d_%H')
+        if (data:=self.cache.get(key)) is not None:return data
+        if (future:=self._inflight.get(key)) is None:
+            future=self._inflight[key]=asyncio.get_running_loop().run_in_executor(None,new_lunar,when)
+            future.add_done_callback(lambda f,k=key:self._done(k,f))
+        return await asyncio.shield(future)
+
+    def _done(self, key, future):
+        self._inflight.pop(key,None)
+        if not future.cancelled() and future.exception() is None:self.cache.put(key,future.result())
+
+    @property
+    def inflight(self): return len(self._inflight)
+
+class AlmanacEngine:
+    """Per-entry almanac snapshot engine: one full computation per (date, hour), shared by every sensor."""
+    def __init__(self, device, lunar_loader, record_loader=None, max_snapshots=8):
+        self._device,self._lunar_loader,self._record_loader,self._max_snapshots=device,lunar_loader,record_loader,max_snapshots
+        self._snapshots=OrderedDict()
+        self._lock=asyncio.Lock()
+
+    @property
+    def device(self): return self._device
+
+    async def async_snapshot(self, now):
+        key=now.strftime('%Y-%m-%d_%H')
+        async with self._lock:
+            if (snapshot:=self._snapshots.get(key)) is not None:
+                self._snapshots.move_to_end(key);return snapshot
+            try:
+                if self._record_loader and (record:=self._record_loader(now)) is not None:snapshot=snapshot_from_record(record,now,self._device.get_holiday)
+                elif (lunar_data:=await self._lunar_loader(now)):snapshot=build_snapshot(lunar_data,now,self._device.get_holiday)
+                else:return None
+            except Exception as e:_LOGGER.error(f"计算黄历快照时出错: {e}");return None
+            self._snapshots[key]=snapshot
+            while len(self._snapshots)>self._max_snapshots:self._snapshots.popitem(last=False)
+            return snapshot
+
+    def query_range(self, start, end, fields=None, hour=12, include_attributes=False):
+        """Side-effect-free almanac for every day in [start, end]; blocking, run it in the executor."""
+        fields=list(fields or ALMANAC_TYPES)
+        if unknown:=[f for f in fields if f not in ALMANAC_TYPES]:raise ValueError(f"未知字段: {', '.join(unknown)}")
+        shichen=TimeHelper.get_current_shichen(hour,0)
+        days,attributes={},{}
+        day=start
+        while day<=end:
+            when=datetime(day.year,day.month,day.day,hour)
+            if not self._record_loader or (record:=self._record_loader(when)) is None:record=build_day_record(new_lunar(when))
+            snapshot=snapshot_from_record(record,when,self._device.get_holiday)
+            key=day.isoformat()
+            days[key]={f:shichen if f=='时辰' else snapshot[f][0] for f in fields if f in snapshot or f=='时辰'}
+            if include_attributes:attributes[key]={f:snapshot[f][1] for f in fields if f in snapshot and snapshot[f][1]}
+            day+=timedelta(days=1)
+        result={"start":start.isoformat(),"end":end.isoformat(),"hour":hour,"days":days}
+        if include_attributes:result["attributes"]=attributes
+        return result
+
+    def clear(self): self._snapshots.clear()
@@ -0,0 +1,134 @@
+import glob,hashlib,json,logging,lzma,mmap,os,struct,sys
+from array import array
+from datetime import date,datetime,timedelta
+from .almanac_engine import DAY_RECORD_FIELDS,LunarCache,LunarLoader,build_day_record,load_cnlunar,new_lunar
+from .const import DOMAIN,DEFAULT_LUNAR_CACHE_SIZE
+from .lunar_calendar import lunar_calendar
+
+_LOGGER = logging.getLogger(__name__)
+
+TABLE_MAGIC=b"CCAT"
+TABLE_VERSION=1
+TABLE_SOURCE=os.path.join(os.path.dirname(os.path.abspath(__file__)),"almanac_table.bin.xz")
+_PREFIX=struct.Struct("<4sHI")
+
+lunar_loader = LunarLoader(LunarCache(DEFAULT_LUNAR_CACHE_SIZE))
+
+class TableLunar:
+    """cnlunar.Lunar-compatible view over a table row for the attributes birthday and moon sensors read."""
+    def __init__(self,record,when):
+        self.date=when
+        self.lunarYear,self.lunarMonth,self.lunarDay=record["lunarYear"],record["lunarMonth"],record["lunarDay"]
+        self.isLunarLeapMonth=bool(record["isLunarLeapMonth"])
+        self.lunarMonthCn,self.lunarDayCn=record["lunarMonthCn"],record["lunarDayCn"]
+        self.year8Char,self.month8Char,self.day8Char=record["year8Char"],record["month8Char"],record["day8Char"]
+        self.chineseYearZodiac=record["chineseYearZodiac"]
+        idx=((when.hour+1)//2)%12*2
+        self.twohour8Char=record["twohour_8char"][idx:idx+2]
+
+def build_table(path,first_year,last_year):
+    """Offline build step (see scripts/build_almanac_table.py): one row of per-field string pool indexes per day, xz-compressed."""
+    fields,start=list(DAY_RECORD_FIELDS),date(first_year,1,1)
+    pools,indexes,day={f:{} for f in fields},array("I"),start
+    while day<=date(last_year,12,31):
+        record=build_day_record(new_lunar(datetime(day.year,day.month,day.day,12)))
+        indexes.extend(pools[f].setdefault(record[f],len(pools[f])) for f in fields)
+        day+=timedelta(days=1)
+    typecode="H" if max(len(p) for p in pools.values())<=0xFFFF else "I"
+    rows=array(typecode,indexes)
+    if sys.byteorder!="little":rows.byteswap()
+    header=json.dumps({"start":start.isoformat(),"days":(day-start).days,"fields":fields,"typecode":typecode,"pools":[list(pools[f]) for f in fields]},ensure_ascii=False).encode("utf-8")
+    offset=_PREFIX.size+len(header)
+    data=_PREFIX.pack(TABLE_MAGIC,TABLE_VERSION,len(header))+header+b"\0"*((-offset)%rows.itemsize)+rows.tobytes()
+    with open(path,"wb") as f:f.write(lzma.compress(data,preset=9|lzma.PRESET_EXTREME))
+
+def unpack_table(source,cache_dir):
+    """Decompress the shipped table into .storage once per table release; returns the path to memory-map."""
+    if not os.path.exists(source):return None
+    with open(source,"rb") as f:packed=f.read()
+    prefix=os.path.join(cache_dir,f"{DOMAIN}.almanac_table")
+    path=f"{prefix}.{hashlib.sha1(packed).hexdigest()[:12]}"
+    if not os.path.exists(path):
+        os.makedirs(cache_dir,exist_ok=True)
+        with open(f"{path}.tmp","wb") as f:f.write(lzma.decompress(packed))
+        os.replace(f"{path}.tmp",path)
+    for stale in glob.glob(f"{prefix}*"):
+        if stale!=path:
+            try:os.remove(stale)
+            except OSError:pass
+    return path
+
+class AlmanacTable:
+    """Memory-mapped almanac day table; one O(1) row lookup replaces a cnlunar.Lunar computation."""
+    _shared=None
+    def __init__(self,path,handle,mm,header,rows):
+        self.path,self._handle,self._mm,self._rows=path,handle,mm,rows
+        self._fields,self._pools,self._width=header["fields"],header["pools"],len(header["fields"])
+        self.start,self.days=date.fromisoformat(header["start"]),header["days"]
+        self.end=self.start+timedelta(days=self.days-1)
+    @classmethod
+    def load(cls,path):
+        if not path or not os.path.exists(path):return None
+        handle,mm=open(path,"rb"),None
+        try:
+            mm=mmap.mmap(handle.fileno(),0,access=mmap.ACCESS_READ)
+            magic,version,header_len=_PREFIX.unpack_from(mm,0)
+            if magic!=TABLE_MAGIC or version!=TABLE_VERSION:raise ValueError("表格版本不匹配")
+            header=json.loads(bytes(mm[_PREFIX.size:_PREFIX.size+header_len]).decode("utf-8"))
+            if header["fields"]!=list(DAY_RECORD_FIELDS):raise ValueError("表格字段不匹配")
+            typecode=header["typecode"]
+            offset=_PREFIX.size+header_len
+            offset+=(-offset)%array(typecode).itemsize
+            if sys.byteorder=="little":rows=memoryview(mm)[offset:].cast("B").cast(typecode)
+            else:
+                rows=array(typecode,bytes(mm[offset:]))
+                rows.byteswap()
+            if len(rows)<header["days"]*len(header["fields"]):raise ValueError("表格数据不完整")
+            return cls(path,handle,mm,header,rows)
+        except Exception as e:
+            if mm is not None:mm.close()
+            handle.close()
+            _LOGGER.warning("无法加载黄历表 %s: %s",path,e)
+            return None
+    def get(self,day):
+        idx=(day-self.start).days
+        if not 0<=idx<self.days:return None
+        base,rows,pools=idx*self._width,self._rows,self._pools
+        return {f:pools[j][rows[base+j]] for j,f in enumerate(self._fields)}
+    def close(self):
+        if isinstance(self._rows,memoryview):self._rows.release()
+        self._mm.close()
+        self._handle.close()
+    @classmethod
+    def shared(cls):return cls._shared
+    @classmethod
+    def set_shared(cls,table):
+        if cls._shared is not None and cls._shared is not table:cls._shared.close()
+        cls._shared=table
+    @classmethod
+    def lookup(cls,when):
+        """Day record for `when`, or None when outside the table or at 23:00, where cnlunar rolls the day pillar forward."""
+        if when.hour==23 or cls._shared is None:return None
+        return cls._shared.get(when.date())
+
+def get_lunar(when):
+    """Blocking lookup; only call it from the executor."""
+    if (record:=AlmanacTable.lookup(when)) is not None:return TableLunar(record,when)
+    return new_lunar(when)
+
+async def async_get_lunar(when):
+    """Table row when available, otherwise a cnlunar.Lunar computed in the executor."""
+    if (record:=AlmanacTable.lookup(when)) is not None:return TableLunar(record,when)
+    return await lunar_loader.async_get(when)
+
+def _load_shared(cache_dir):
+    load_cnlunar()
+    lunar_calendar()
+    if (table:=AlmanacTable.load(unpack_table(TABLE_SOURCE,cache_dir))) is None:
+        _LOGGER.warning("未找到黄历表 %s，将使用cnlunar实时计算",TABLE_SOURCE)
+    AlmanacTable.set_shared(table)
+
+async def async_setup_almanac_table(hass):
+    """Only loads the shipped table; it is generated offline, never at runtime."""
+    try:await hass.async_add_executor_job(_load_shared,hass.config.path(".storage"))
+    except Exception as e:_LOGGER.error("加载黄历表失败: %s",e)
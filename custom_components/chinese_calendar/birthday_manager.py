@@ -1,19 +1,172 @@
-import warnings
-warnings.filterwarnings("ignore", message="pkg_resources is deprecated", category=UserWarning, module="zhconv")
-
-from datetime import datetime
-import cnlunar # pyright: ignore[reportMissingImports]
-import aiohttp
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.event import async_track_point_in_time
 from homeassistant.util import dt
 from .const import (
     DOMAIN,
-    DATA_FORMAT
+    DATA_FORMAT,
+    CONF_BIRTHDAYS,
+    CONF_AI_BATCH
 )
-import zhconv  # pyright: ignore[reportMissingImports]
+from .almanac_table import async_get_lunar
+from .ai_client import get_ai_client
+from .records import get_records, next_lunar_birthday
+from .text_convert import resolve_language, convert_text, convert_value
+
+_LOGGER = logging.getLogger(__name__)
+
+BIRTHDAY_STATE_VERSION = 1
+STATIC_TYPES = ("农历生日", "八字", "喜用神")
+DAILY_TYPES = ("生日提醒_农", "今日运势", "AI运势")
+FAILED_STATES = ("农历生日计算出错", "AI接口调用失败")
+
+
+class BirthdayStateStore:
+    """Per-entry .storage file with the last computed state of each birthday sensor and its last notification date."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = Store(hass, BIRTHDAY_STATE_VERSION, f"{DOMAIN}.birthday_state.{entry_id}")
+        self._data = {}
+
+    async def async_load(self) -> None:
+        self._data = await self._store.async_load() or {}
+
+    def get(self, unique_id: str) -> dict:
+        return self._data.get(unique_id) or {}
+
+    def set(self, unique_id: str, record: dict) -> None:
+        if self._data.get(unique_id) != record:
+            self._data[unique_id] = record
+            self._store.async_delay_save(lambda: self._data, 5)
+
+    def retain(self, unique_ids) -> None:
+        if stale := self._data.keys() - set(unique_ids):
+            for unique_id in stale:
+                del self._data[unique_id]
+            self._store.async_delay_save(lambda: self._data, 5)
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+
+class BirthdayCoordinator:
+    """Refreshes every birthday sensor of one entry in one pass at local midnight and writes only the states that changed."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._sensors = set()
+        self._unsub = None
+
+    def add(self, sensor) -> None:
+        self._sensors.add(sensor)
+        self._arm()
+
+    def remove(self, sensor) -> None:
+        self._sensors.discard(sensor)
+        if not self._sensors:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        if self._unsub:
+            self._unsub()
+        self._unsub = None
+
+    def _arm(self) -> None:
+        if self._unsub is None and self._sensors:
+            self._unsub = async_track_point_in_time(self._hass, self._async_fire, dt.start_of_local_day() + timedelta(days=1))
+
+    async def _async_fire(self, _now) -> None:
+        self._unsub = None
+        try:
+            await self.async_refresh()
+        finally:
+            self._arm()
+
+    async def async_refresh(self) -> None:
+        """Update all sensors together, so AI requests of one endpoint can share a batch, then write the changed ones."""
+        sensors = list(self._sensors)
+        before = [sensor.snapshot() for sensor in sensors]
+        for sensor, result in zip(sensors, await asyncio.gather(*(sensor.async_update() for sensor in sensors), return_exceptions=True)):
+            if isinstance(result, Exception):
+                _LOGGER.error("生日定时更新出错: %s", result)
+        for sensor, old in zip(sensors, before):
+            if sensor.snapshot() != old:
+                sensor.async_write_ha_state()
+
+
+def calculate_lucky_color(birth_date):
+    date_str = birth_date.strftime("%Y%m%d%H")
+    num_sum = sum(int(digit) for digit in date_str)
+    while num_sum > 9:
+        num_sum = sum(int(digit) for digit in str(num_sum))
+    color_map = {
+        1: "红色", 2: "红色",
+        3: "绿色", 4: "绿色",
+        5: "黄色", 6: "黄色",
+        7: "蓝色", 8: "蓝色",
+        9: "白色", 0: "白色"
+    }
+    return color_map[num_sum]
+
+def get_zodiac_sign(birth_date):
+    month = birth_date.month
+    day = birth_date.day
+    zodiac_dates = [
+        ((1, 20), (2, 18), "水瓶座"), ((2, 19), (3, 20), "双鱼座"),
+        ((3, 21), (4, 19), "白羊座"), ((4, 20), (5, 20), "金牛座"),
+        ((5, 21), (6, 20), "双子座"), ((6, 21), (7, 22), "巨蟹座"),
+        ((7, 23), (8, 22), "狮子座"), ((8, 23), (9, 22), "处女座"),
+        ((9, 23), (10, 22), "天秤座"), ((10, 23), (11, 21), "天蝎座"),
+        ((11, 22), (12, 21), "射手座"), ((12, 22), (1, 19), "摩羯座")
+    ]
+
+    for (start_month, start_day), (end_month, end_day), sign in zodiac_dates:
+        if (month == start_month and day >= start_day) or (month == end_month and day <= end_day):
+            return sign
+    return "摩羯座"
+
+def get_element_attributes(day8char):
+    elements = {
+        "甲": "木", "乙": "木",
+        "丙": "火", "丁": "火",
+        "戊": "土", "己": "土",
+        "庚": "金", "辛": "金",
+        "壬": "水", "癸": "水"
+    }
+    element = elements[day8char[0]]
+    attributes = {
+        "木": "生长、向上、清雅",
+        "火": "温暖、活力、激情",
+        "土": "稳重、包容、务实",
+        "金": "坚毅、果断、正直",
+        "水": "智慧、灵活、适应"
+    }
+    return f"{element}({attributes[element]})"
+
+
+class PersonProfile:
+    """Birth-chart values of one person, computed once per entry load and shared by all of that person's sensors."""
+
+    __slots__ = ("year8Char", "month8Char", "day8Char", "twohour8Char", "pillars", "lunar_birthday", "zodiac", "element", "lucky_color")
+
+    def __init__(self, birthday: datetime, lunar):
+        self.year8Char, self.month8Char, self.day8Char, self.twohour8Char = lunar.year8Char, lunar.month8Char, lunar.day8Char, lunar.twohour8Char
+        self.pillars = f"{lunar.year8Char}年{lunar.month8Char}月{lunar.day8Char}日{lunar.twohour8Char}时"
+        self.lunar_birthday = f"{lunar.lunarMonthCn}{lunar.lunarDayCn}"
+        self.zodiac = get_zodiac_sign(birthday)
+        self.element = get_element_attributes(lunar.day8Char)
+        self.lucky_color = calculate_lucky_color(birthday)
+
+    @classmethod
+    async def async_create(cls, birthday: datetime) -> "PersonProfile":
+        return cls(birthday, await async_get_lunar(birthday))
+
 
 class BirthdayDevice:
     def __init__(self, entry_id: str, language="auto"):
@@ -30,8 +183,13 @@ class BirthdayDevice:
         )
 
 class BirthdaySensor(SensorEntity):
-    def __init__(self, hass, device, person, sensor_type, entry_id):
+    def __init__(self, hass, device, person, sensor_type, entry_id, state_store=None, profile=None, coordinator=None):
         self.hass = hass
+        self._coordinator = coordinator
+        self._profile = profile
+        self._state_store = state_store
+        self._restore_pending = state_store is not None
+        self._restored_static = False
         self._device = device
         self._person = person
         self._name = person["name"]
@@ -46,6 +204,7 @@ class BirthdaySensor(SensorEntity):
         self._ai_api_url = person.get("ai_api_url")
         self._ai_api_key = person.get("ai_api_key")
         self._ai_model = person.get("ai_model", "deepseek-r1")
+        self._ai_batch = person.get(CONF_AI_BATCH, False)
         
         self._available = True
         self._attr_has_entity_name = True
@@ -62,20 +221,11 @@ class BirthdaySensor(SensorEntity):
             else:
                 self._attr_entity_registry_enabled_default = False
 
+    def _language(self):
+        return resolve_language(self.hass, self._device._language)
+
     def _convert_text(self, text):
-        if not text or not isinstance(text, str):
-            return text
-            
-        language = self._device._language
-        if language == "auto":
-            language = self.hass.config.language
-        
-        if language == "zh-Hant":
-            try:
-                return zhconv.convert(text, 'zh-hant')
-            except Exception as e:
-                return text
-        return text
+        return convert_text(text, self._language())
 
     @property 
     def name(self):
@@ -95,120 +245,38 @@ class BirthdaySensor(SensorEntity):
 
     @property
     def extra_state_attributes(self):
-        converted_attrs = {}
         if not self._attributes:
             return {}
-            
-        for key, value in self._attributes.items():
-            out_key = self._convert_text(key)
-            if isinstance(value, str):
-                converted_attrs[out_key] = self._convert_text(value)
-            elif isinstance(value, dict):
-                converted_dict = {}
-                for k, v in value.items():
-                    sub_key = self._convert_text(k)
-                    if isinstance(v, str):
-                        converted_dict[sub_key] = self._convert_text(v)
-                    else:
-                        converted_dict[sub_key] = v
-                converted_attrs[out_key] = converted_dict
-            else:
-                converted_attrs[out_key] = value
-        return converted_attrs
+        return convert_value(self._attributes, self._language(), keys=True)
 
     @property
     def available(self):
         return self._available
 
+    @property
+    def should_poll(self):
+        return self._coordinator is None
+
+    async def async_added_to_hass(self):
+        if self._coordinator:
+            self._coordinator.add(self)
+
+    async def async_will_remove_from_hass(self):
+        if self._coordinator:
+            self._coordinator.remove(self)
+
+    def snapshot(self) -> tuple:
+        return self._state, dict(self._attributes), self._available
+
     @property
     def icon(self):
         return 'mdi:calendar-star'
 
-    async def _call_ai_api(self, prompt):
+    async def _call_ai_api(self, prompt, day=None):
         if not self._ai_api_url or not self._ai_api_key:
             return None
-            
-        try:
-            headers = {
-                "Authorization": f"Bearer {self._ai_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": self._ai_model,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 500
-            }
-            
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(f"{self._ai_api_url}/v1/chat/completions", 
-                                      headers=headers, 
-                                      json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    return None
-        except Exception:
-            return None
-
-    def _calculate_lucky_color(self, birth_date):
-        date_str = birth_date.strftime("%Y%m%d%H")
-        num_sum = sum(int(digit) for digit in date_str)
-        while num_sum > 9:
-            num_sum = sum(int(digit) for digit in str(num_sum))
-        color_map = {
-            1: "红色", 2: "红色",
-            3: "绿色", 4: "绿色",
-            5: "黄色", 6: "黄色",
-            7: "蓝色", 8: "蓝色",
-            9: "白色", 0: "白色"
-        }
-        return color_map[num_sum]
-
-    def _get_zodiac_sign(self, birth_date):
-        month = birth_date.month
-        day = birth_date.day
-        zodiac_dates = [
-            ((1, 20), (2, 18), "水瓶座"), ((2, 19), (3, 20), "双鱼座"),
-            ((3, 21), (4, 19), "白羊座"), ((4, 20), (5, 20), "金牛座"),
-            ((5, 21), (6, 20), "双子座"), ((6, 21), (7, 22), "巨蟹座"),
-            ((7, 23), (8, 22), "狮子座"), ((8, 23), (9, 22), "处女座"),
-            ((9, 23), (10, 22), "天秤座"), ((10, 23), (11, 21), "天蝎座"),
-            ((11, 22), (12, 21), "射手座"), ((12, 22), (1, 19), "摩羯座")
-        ]
-        
-        for (start_month, start_day), (end_month, end_day), sign in zodiac_dates:
-            if (month == start_month and day >= start_day) or (month == end_month and day <= end_day):
-                return sign
-        return "摩羯座"
-
-    def _get_element_attributes(self, lunar_info):
-        elements = {
-            "甲": "木", "乙": "木",
-            "丙": "火", "丁": "火",
-            "戊": "土", "己": "土",
-            "庚": "金", "辛": "金",
-            "壬": "水", "癸": "水"
-        }
-        element = elements[lunar_info.day8Char[0]]
-        attributes = {
-            "木": "生长、向上、清雅",
-            "火": "温暖、活力、激情",
-            "土": "稳重、包容、务实",
-            "金": "坚毅、果断、正直",
-            "水": "智慧、灵活、适应"
-        }
-        return f"{element}({attributes[element]})"
-
-    def _calculate_lunar_days_between(self, from_month, from_day, to_month, to_day):
-        try:
-            return to_day - from_day if from_month == to_month else max(0, (to_month - from_month + (12 if to_month < from_month else 0)) * 30 + (to_day - from_day))
-        except Exception:
-            return 30
+        client = get_ai_client(self.hass, self._ai_api_url, self._ai_api_key)
+        return await client.async_complete(self._ai_model, prompt, person=self._person.get("id", self._name), day=day)
 
     def _analyze_daily_fortune(self, birth_lunar, today_lunar):
         gan_relations = {
@@ -341,196 +409,246 @@ class BirthdaySensor(SensorEntity):
             }
         }
 
+    async def _async_profile(self) -> PersonProfile:
+        if self._profile is None:
+            self._profile = await PersonProfile.async_create(self._birthday)
+        return self._profile
+
+    def _state_key(self, today: date) -> str:
+        key = self._person["birthday"] if self._type != "AI运势" else f"{self._person['birthday']}|{self._ai_model}"
+        return key if self._type in STATIC_TYPES else f"{key}|{today.isoformat()}"
+
+    def _restore_state(self, today: date) -> None:
+        """Reuse what was computed before a restart: today's daily values, the birth-chart values and the notification date."""
+        self._restore_pending = False
+        saved = self._state_store.get(self.unique_id)
+        if notified := saved.get("notified"):
+            self._last_notification_date = date.fromisoformat(notified)
+        if self._type not in STATIC_TYPES + DAILY_TYPES or saved.get("key") != self._state_key(today):
+            return
+        self._state, self._attributes = saved.get("state"), dict(saved.get("attributes") or {})
+        if self._type in STATIC_TYPES:
+            self._restored_static = True
+        elif self._type == "生日提醒_农":
+            self._last_calc_date = today
+        elif self._type == "今日运势":
+            self._last_fortune_date = today
+        else:
+            self._last_ai_date = today
+
+    def _save_state(self, today: date) -> None:
+        record = {}
+        if self._type in STATIC_TYPES + DAILY_TYPES and self._state is not None and self._state not in FAILED_STATES:
+            record.update(key=self._state_key(today), state=self._state, attributes=dict(self._attributes))
+        if self._last_notification_date is not None:
+            record["notified"] = self._last_notification_date.isoformat()
+        if record:
+            self._state_store.set(self.unique_id, record)
+
     async def async_update(self):
         try:
-            if self._type == "阳历生日":
-                self._state = self._birthday.strftime("%y年%m月%d日")
-
-            elif self._type == "农历生日":
-                if not hasattr(self, '_cached_lunar_basic'):
-                    self._cached_lunar_basic = cnlunar.Lunar(self._birthday)
-                lunar = self._cached_lunar_basic
-                self._state = f"{lunar.lunarMonthCn}{lunar.lunarDayCn}"
-                
-            elif self._type == "八字":
-                if not hasattr(self, '_cached_lunar_8char'):
-                    self._cached_lunar_8char = cnlunar.Lunar(self._birthday, godType='8char')
-                lunar = self._cached_lunar_8char
-                self._state = f"{lunar.year8Char}年{lunar.month8Char}月{lunar.day8Char}日{lunar.twohour8Char}时"
-
-            elif self._type == "生日提醒_农":
-                    today = dt.now().replace(tzinfo=None)
-                    
-                    if hasattr(self, '_last_calc_date') and self._last_calc_date == today.date():
-                        return
-                    self._last_calc_date = today.date()
-                    
-                    birth_lunar = cnlunar.Lunar(self._birthday, godType='8char')
-                    birth_lunar_month = birth_lunar.lunarMonth
-                    birth_lunar_day = birth_lunar.lunarDay
-                    
-                    today_lunar = cnlunar.Lunar(today, godType='8char')
-                    today_lunar_month = today_lunar.lunarMonth
-                    today_lunar_day = today_lunar.lunarDay
-                    today_lunar_year = today_lunar.lunarYear
-                    
-                    try:
-                        next_birthday_year = today_lunar_year if (today_lunar_month < birth_lunar_month or (today_lunar_month == birth_lunar_month and today_lunar_day < birth_lunar_day)) else today_lunar_year + 1
-                        days_until = self._calculate_lunar_days_between(today_lunar_month, today_lunar_day, birth_lunar_month, birth_lunar_day)
-                        
-                        self._state = "今天是生日" if days_until == 0 else f"农历生日还有{days_until}天"
-                        self._attributes.update({"下个生日": f"阳历：{next_birthday_year}-{birth_lunar_month:02d}-{birth_lunar_day:02d}"})
-                        
-                        if days_until == 0 and self._notification_service and (self._last_notification_date is None or self._last_notification_date != today.date()):
-                            await self.hass.services.async_call("notify", self._notification_service.replace("notify.", ""), {"title": "中国老黄历 · Home Assistant", "message": self._notification_message})
-                            self._last_notification_date = today.date()
-                    except Exception as e:
-                        self._state = "农历生日计算出错"
-                        return
+            today = dt.now().replace(tzinfo=None).date()
+            if self._restore_pending:
+                self._restore_state(today)
+            if self._restored_static:
+                return
+            await self._async_compute()
+            if self._state_store is not None:
+                self._save_state(today)
+        except Exception:
+            self._available = False
+
+    async def _async_compute(self):
+        if self._type == "阳历生日":
+            self._state = self._birthday.strftime("%y年%m月%d日")
 
+        elif self._type == "农历生日":
+            self._state = (await self._async_profile()).lunar_birthday
+            
+        elif self._type == "八字":
+            self._state = (await self._async_profile()).pillars
 
-            elif self._type == "生日提醒_阳":
+        elif self._type == "生日提醒_农":
                 today = dt.now().replace(tzinfo=None)
-                birthday_this_year = self._birthday.replace(year=today.year)
                 
-                if birthday_this_year.date() < today.date():
-                    birthday_this_year = birthday_this_year.replace(year=today.year + 1)
-                
-                days_until = (birthday_this_year.date() - today.date()).days
-                
-                if days_until == 0:
-                    self._state = "今天是生日"
-                    if (self._notification_service and
-                        (self._last_notification_date is None or
-                        self._last_notification_date != today.date())):
-                        await self.hass.services.async_call(
-                            "notify",
-                            self._notification_service.replace("notify.", ""),
-                            {
-                                "title": "中国老黄历 · Home Assistant",
-                                "message": self._notification_message
-                            }
-                        )
-                        self._last_notification_date = today.date()
-                else:
-                    self._state = f"阳历生日还有{days_until}天"
-
-            elif self._type == "星座":
-                self._state = self._get_zodiac_sign(self._birthday)
-
-            elif self._type == "喜用神":
-                if not hasattr(self, '_cached_lunar_8char'):
-                    self._cached_lunar_8char = cnlunar.Lunar(self._birthday, godType='8char')
-                lunar = self._cached_lunar_8char
-                element_attr = self._get_element_attributes(lunar)
-                lucky_color = self._calculate_lucky_color(self._birthday)
-                self._state = f"{lucky_color}，五行：{element_attr}"
-
-            elif self._type == "今日运势":
-                today = dt.now().replace(tzinfo=None).date()
-                if hasattr(self, '_last_fortune_date') and self._last_fortune_date == today:
+                if hasattr(self, '_last_calc_date') and self._last_calc_date == today.date():
                     return
-                self._last_fortune_date = today
+                self._last_calc_date = today.date()
                 
-                current_time = dt.now().replace(tzinfo=None)  
-                if not hasattr(self, '_cached_birth_lunar'):
-                    self._cached_birth_lunar = cnlunar.Lunar(self._birthday.replace(tzinfo=None), godType='8char')
-                birth_lunar = self._cached_birth_lunar
-                today_lunar = cnlunar.Lunar(current_time, godType='8char')
-                fortune_result = self._analyze_daily_fortune(birth_lunar, today_lunar)
-                self._state = fortune_result["state"]
-                self._attributes = fortune_result["attributes"]
-
-            elif self._type == "生存天数":
                 try:
-                    today = dt.now().replace(tzinfo=None)
-                    birth_date = self._birthday.date()  
-                    current_date = today.date()
-                    days_lived = (current_date - birth_date).days
-                    self._state = f"您在地球存活了 {days_lived} 天"
-                except Exception:
-                    pass
-                
-            elif self._type == "周岁":
-                today = dt.now().replace(tzinfo=None)
-                age = today.year - self._birthday.year
-                if today.month < self._birthday.month or (today.month == self._birthday.month and today.day < self._birthday.day):
-                    age -= 1
-                self._state = f"{age}岁"
-
-            elif self._type == "AI运势":
-                if not self._ai_api_url or not self._ai_api_key:
-                    self._state = "未配置AI接口"
-                    return
-                
-                if not self._ai_model:
-                    self._state = "AI功能未启用"
-                    return
+                    if (next_birthday := next_lunar_birthday(self._birthday.date(), today.date())) is None:
+                        self._state = "农历生日计算出错"
+                        return
+                    days_until = (next_birthday - today.date()).days
+                    
+                    self._state = "今天是生日" if days_until == 0 else f"农历生日还有{days_until}天"
+                    self._attributes.update({"下个生日": f"阳历：{next_birthday.isoformat()}"})
                     
-                today = dt.now().replace(tzinfo=None).date()
-                if hasattr(self, '_last_ai_date') and self._last_ai_date == today:
+                    if days_until == 0 and self._notification_service and (self._last_notification_date is None or self._last_notification_date != today.date()):
+                        await self.hass.services.async_call("notify", self._notification_service.replace("notify.", ""), {"title": "中国老黄历 · Home Assistant", "message": self._notification_message})
+                        self._last_notification_date = today.date()
+                except Exception as e:
+                    self._state = "农历生日计算出错"
                     return
-                self._last_ai_date = today
-                
-                birth_lunar = cnlunar.Lunar(self._birthday, godType='8char')
-                today_lunar = cnlunar.Lunar(dt.now().replace(tzinfo=None), godType='8char')
+
+
+        elif self._type == "生日提醒_阳":
+            today = dt.now().replace(tzinfo=None)
+            birthday_this_year = self._birthday.replace(year=today.year)
+            
+            if birthday_this_year.date() < today.date():
+                birthday_this_year = birthday_this_year.replace(year=today.year + 1)
+            
+            days_until = (birthday_this_year.date() - today.date()).days
+            
+            if days_until == 0:
+                self._state = "今天是生日"
+                if (self._notification_service and
+                    (self._last_notification_date is None or
+                    self._last_notification_date != today.date())):
+                    await self.hass.services.async_call(
+                        "notify",
+                        self._notification_service.replace("notify.", ""),
+                        {
+                            "title": "中国老黄历 · Home Assistant",
+                            "message": self._notification_message
+                        }
+                    )
+                    self._last_notification_date = today.date()
+            else:
+                self._state = f"阳历生日还有{days_until}天"
+
+        elif self._type == "星座":
+            self._state = (await self._async_profile()).zodiac
+
+        elif self._type == "喜用神":
+            profile = await self._async_profile()
+            self._state = f"{profile.lucky_color}，五行：{profile.element}"
+
+        elif self._type == "今日运势":
+            today = dt.now().replace(tzinfo=None).date()
+            if hasattr(self, '_last_fortune_date') and self._last_fortune_date == today:
+                return
+            self._last_fortune_date = today
+            
+            current_time = dt.now().replace(tzinfo=None)  
+            birth_lunar = await self._async_profile()
+            today_lunar = await async_get_lunar(current_time)
+            fortune_result = self._analyze_daily_fortune(birth_lunar, today_lunar)
+            self._state = fortune_result["state"]
+            self._attributes = fortune_result["attributes"]
+
+        elif self._type == "生存天数":
+            try:
+                today = dt.now().replace(tzinfo=None)
+                birth_date = self._birthday.date()  
+                current_date = today.date()
+                days_lived = (current_date - birth_date).days
+                self._state = f"您在地球存活了 {days_lived} 天"
+            except Exception:
+                pass
+            
+        elif self._type == "周岁":
+            today = dt.now().replace(tzinfo=None)
+            age = today.year - self._birthday.year
+            if today.month < self._birthday.month or (today.month == self._birthday.month and today.day < self._birthday.day):
+                age -= 1
+            self._state = f"{age}岁"
+
+        elif self._type == "AI运势":
+            if not self._ai_api_url or not self._ai_api_key:
+                self._state = "未配置AI接口"
+                return
+            
+            if not self._ai_model:
+                self._state = "AI功能未启用"
+                return
                 
-                prompt = f"""请为{self._name}进行今日生日运势预测。
+            today = dt.now().replace(tzinfo=None).date()
+            if hasattr(self, '_last_ai_date') and self._last_ai_date == today:
+                return
+            self._last_ai_date = today
+            
+            birth_lunar = await self._async_profile()
+            today_lunar = await async_get_lunar(dt.now().replace(tzinfo=None))
+            
+            prompt = f"""请为{self._name}进行今日生日运势预测。
 生日信息：{self._birthday.strftime('%Y年%m月%d日')}
-八字：{birth_lunar.year8Char}年{birth_lunar.month8Char}月{birth_lunar.day8Char}日{birth_lunar.twohour8Char}时
+八字：{birth_lunar.pillars}
 今日：{today_lunar.day8Char}日
 请从运势、财运、感情、健康、工作等方面给出简洁的预测分析，控制在240字以内，注意必须开头介绍八字天干地支和今日的关系。且输出文本为纯文本格式"""
 
-                ai_result = await self._call_ai_api(prompt)
-                if ai_result:
-                    self._state = "AI运势已更新"
-                    self._attributes.update({
-                        "AI预测": ai_result,
-                        "更新时间": today.strftime("%Y-%m-%d"),
-                        "使用模型": self._ai_model
-                    })
-                else:
-                    self._state = "AI接口调用失败"
+            if self._ai_batch:
+                client = get_ai_client(self.hass, self._ai_api_url, self._ai_api_key)
+                ai_result = await client.async_complete_batched(
+                    self._ai_model, prompt, self._person.get("id", self._name), today,
+                    f"请为以下每位分别进行今日生日运势预测。\n今日：{today_lunar.day8Char}日",
+                    f"{self._name}，生日{self._birthday.strftime('%Y年%m月%d日')}，八字{birth_lunar.pillars}",
+                    "每位都从运势、财运、感情、健康、工作等方面给出简洁的预测分析，控制在240字以内，注意必须开头介绍八字天干地支和今日的关系，预测文本为纯文本格式。",
+                )
+            else:
+                ai_result = await self._call_ai_api(prompt, today)
+            if ai_result:
+                self._state = "AI运势已更新"
+                self._attributes.update({
+                    "AI预测": ai_result,
+                    "更新时间": today.strftime("%Y-%m-%d"),
+                    "使用模型": self._ai_model
+                })
+            else:
+                self._state = "AI接口调用失败"
+
 
+class BirthdaySensorGroup:
+    """Device, state store and coordinator shared by the birthday sensors of one entry, and those sensors by person id."""
+
+    SENSOR_TYPES = ("阳历生日", "农历生日", "八字", "生日提醒_农", "生日提醒_阳", "星座", "喜用神", "今日运势", "生存天数", "周岁")
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, language: str, state_store: BirthdayStateStore):
+        self.hass = hass
+        self.entry_id = entry_id
+        self.device = BirthdayDevice(entry_id, language)
+        self.state_store = state_store
+        self.coordinator = BirthdayCoordinator(hass)
+        self.sensors = {}
+
+    async def async_build(self, person_id: str, person: dict) -> list:
+        """Sensors of one person, recorded under `person_id`; empty when the record lacks a name or birthday."""
+        if not person.get("name") or not person.get("birthday"):
+            return []
+        person_data = {"id": person_id, **person}
+        try:
+            profile = await PersonProfile.async_create(datetime.strptime(person["birthday"], DATA_FORMAT))
         except Exception:
-            self._available = False
+            profile = None
+        sensor_types = list(self.SENSOR_TYPES)
+        if person_data.get("ai_api_key") and person_data.get("ai_model") and person_data.get("ai_api_url"):
+            sensor_types.append("AI运势")
+        sensors = self.sensors[person_id] = [
+            BirthdaySensor(self.hass, self.device, person_data, sensor_type, self.entry_id, self.state_store, profile, self.coordinator)
+            for sensor_type in sensor_types
+        ]
+        return sensors
+
+    def retain(self) -> None:
+        self.state_store.retain(sensor.unique_id for sensors in self.sensors.values() for sensor in sensors)
+
+
+async def async_get_birthday_group(hass: HomeAssistant, entry_id: str, config_data: dict) -> BirthdaySensorGroup:
+    entry_data = hass.data.setdefault(DOMAIN, {}).setdefault(entry_id, {})
+    if (group := entry_data.get("birthday_group")) is None:
+        state_store = BirthdayStateStore(hass, entry_id)
+        await state_store.async_load()
+        group = entry_data["birthday_group"] = BirthdaySensorGroup(hass, entry_id, config_data.get("language", "auto"), state_store)
+    return group
+
 
 async def setup_birthday_sensors(hass: HomeAssistant, entry_id: str, config_data: dict):
-    
     entities = []
     if config_data.get("birthday_enabled", False):
-        language = config_data.get("language", "auto")
-        
-        birthday_device = BirthdayDevice(entry_id, language)
-        person_count = sum(1 for key in config_data if key.startswith("person") and key.endswith("_name"))
-        
-        for i in range(1, person_count + 1):
-            name = config_data.get(f"person{i}_name")
-            birthday = config_data.get(f"person{i}_birthday")
-            
-            if name and birthday:
-                person_data = {
-                    "name": config_data[f"person{i}_name"],
-                    "birthday": config_data[f"person{i}_birthday"],
-                    "notification_service": config_data.get(f"person{i}_notification_service"),
-                    "notification_message": config_data.get(f"person{i}_notification_message"),
-                    "ai_api_url": config_data.get(f"person{i}_ai_api_url"),
-                    "ai_api_key": config_data.get(f"person{i}_ai_api_key"),
-                    "ai_model": config_data.get(f"person{i}_ai_model")
-                }
-                
-                sensor_types = [
-                    "阳历生日", "农历生日", "八字", "生日提醒_农", "生日提醒_阳",
-                    "星座", "喜用神", "今日运势", "生存天数", "周岁"
-                ]
-                
-                if (person_data.get("ai_api_key") and 
-                    person_data.get("ai_model") and 
-                    person_data.get("ai_api_url")):
-                    sensor_types.append("AI运势")
-                
-                for sensor_type in sensor_types:
-                    sensor = BirthdaySensor(hass, birthday_device, person_data, sensor_type, entry_id)
-                    entities.append(sensor)
-    
+        group = await async_get_birthday_group(hass, entry_id, config_data)
+        for person_id, person in get_records(config_data, CONF_BIRTHDAYS).items():
+            entities.extend(await group.async_build(person_id, person))
+        group.retain()
+
     return entities
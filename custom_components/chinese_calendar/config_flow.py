@@ -19,8 +19,8 @@ from .const import (
     DOMAIN,
     DATA_FORMAT,
     EVENT_DATE_FORMAT,
-    MAX_BIRTHDAYS,
-    MAX_EVENTS,
+    CONF_BIRTHDAYS,
+    CONF_EVENTS,
     CONF_BIRTHDAY_ENABLED,
     CONF_EVENT_ENABLED,
     CONF_NOTIFICATION_ENABLED,
@@ -29,9 +29,13 @@ from .const import (
     CONF_AI_ENABLED,
     CONF_AI_API_KEY,
     CONF_AI_MODEL,
+    CONF_AI_BATCH,
+    CONF_LUNAR_CACHE_SIZE,
+    DEFAULT_LUNAR_CACHE_SIZE,
     DEFAULT_AI_API_URL,
     AI_MODELS,
 )
+from .records import find_record_id, get_records, new_record_id, with_record, without_record
 
 LOGGER = logging.getLogger(__name__)
 
@@ -45,12 +49,14 @@ def validate_date(date_str: str, is_event: bool = False) -> str:
     except ValueError:
         raise vol.Invalid("invalid_date_format" if not is_event else "invalid_event_date_format")
 
+def without_notification(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k not in (CONF_NOTIFICATION_SERVICE, CONF_NOTIFICATION_MESSAGE)}
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
-    VERSION = 1
+    VERSION = 2
     
     def __init__(self):
         self.data = {}
-        self.current_person = 0
 
     async def async_step_user(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if self._async_current_entries():
@@ -87,26 +93,25 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
         
         if user_input is not None:
-            for i in range(1, self.current_person + 1):
-                if (f"person{i}_name" in self.data and 
-                    self.data[f"person{i}_name"] == user_input["name"]):
-                    errors["name"] = "name_already_exists"
-                    return self.async_show_form(
-                        step_id="birthday",
-                        data_schema=vol.Schema({
-                            vol.Required("name"): str,
-                            vol.Required("birthday"): str,
-                        }),
-                        errors=errors
-                    )
+            if find_record_id(self.data, CONF_BIRTHDAYS, user_input["name"]):
+                errors["name"] = "name_already_exists"
+                return self.async_show_form(
+                    step_id="birthday",
+                    data_schema=vol.Schema({
+                        vol.Required("name"): str,
+                        vol.Required("birthday"): str,
+                    }),
+                    errors=errors
+                )
             
             try:
                 validate_date(user_input["birthday"])
-                self.current_person += 1
-                self.data[f"person{self.current_person}_name"] = user_input["name"]
-                self.data[f"person{self.current_person}_birthday"] = user_input["birthday"]
+                self.data = with_record(self.data, CONF_BIRTHDAYS, new_record_id(), {
+                    "name": user_input["name"],
+                    "birthday": user_input["birthday"],
+                })
 
-                if not user_input.get("add_another") or self.current_person >= MAX_BIRTHDAYS:
+                if not user_input.get("add_another"):
                     if self.data.get(CONF_EVENT_ENABLED):
                         return await self.async_step_event()
                     return await self.async_step_name()
@@ -119,10 +124,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         schema = {
             vol.Required("name"): str,
             vol.Required("birthday"): str,
+            vol.Optional("add_another", default=False): bool,
         }
-        
-        if self.current_person < MAX_BIRTHDAYS - 1:
-            schema[vol.Optional("add_another", default=False)] = bool
 
         return self.async_show_form(
             step_id="birthday",
@@ -132,19 +135,17 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_event(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         errors = {}
-        event_count = sum(1 for key in self.data if key.startswith("event") and key.endswith("_name"))
-
-
 
         if user_input is not None:
             try:
                 validate_date(user_input["date"], is_event=True)
-                event_count += 1
-                self.data[f"event{event_count}_name"] = user_input["name"]
-                self.data[f"event{event_count}_date"] = user_input["date"]
-                self.data[f"event{event_count}_desc"] = user_input.get("description", "")
+                self.data = with_record(self.data, CONF_EVENTS, new_record_id(), {
+                    "name": user_input["name"],
+                    "date": user_input["date"],
+                    "desc": user_input.get("description", ""),
+                })
                 
-                if not user_input.get("add_another") or event_count >= MAX_EVENTS:
+                if not user_input.get("add_another"):
                     return await self.async_step_name() 
     
                 return await self.async_step_event()
@@ -156,10 +157,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Required("name"): str,
             vol.Required("date"): str,
             vol.Optional("description", default=""): str,
+            vol.Optional("add_another", default=False): bool,
         }
-        
-        if event_count < MAX_EVENTS - 1:
-            schema[vol.Optional("add_another", default=False)] = bool
 
         return self.async_show_form(
             step_id="event",
@@ -196,7 +195,9 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         self.data = dict(config_entry.data)
         self.person_name = None
+        self.person_id = None
         self.event_name = None
+        self.event_id = None
         self.selected_area = None
         self._edit_event_data = None
 
@@ -209,7 +210,13 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self.data = dict(new_data)
 
     async def async_step_init(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
+        current_cache_size = self.config_entry.options.get(CONF_LUNAR_CACHE_SIZE, self.data.get(CONF_LUNAR_CACHE_SIZE, DEFAULT_LUNAR_CACHE_SIZE))
         if user_input is not None:
+            if (cache_size := user_input.get(CONF_LUNAR_CACHE_SIZE, current_cache_size)) != current_cache_size:
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry,
+                    options={**self.config_entry.options, CONF_LUNAR_CACHE_SIZE: cache_size}
+                )
             self.selected_area = user_input["area"]
             if self.selected_area == "holidays":
                 return await self.async_step_edit_holidays()
@@ -227,7 +234,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         ],
                         mode="dropdown"
                     )
-                )
+                ),
+                vol.Optional(CONF_LUNAR_CACHE_SIZE, default=current_cache_size): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=5000)
+                ),
             })
         )
 
@@ -278,6 +288,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_select_person(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if user_input is not None:
             self.person_name = user_input["person_index"]
+            self.person_id = find_record_id(self.data, CONF_BIRTHDAYS, self.person_name)
             if self.current_action == "edit":
                 return await self.async_step_edit_birthday()
             return await self.async_step_delete_birthday()
@@ -302,6 +313,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_select_event(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if user_input is not None:
             self.event_name = user_input["event_index"]
+            self.event_id = find_record_id(self.data, CONF_EVENTS, self.event_name)
             if self.current_action == "edit":
                 return await self.async_step_edit_event()
             return await self.async_step_delete_event()
@@ -324,49 +336,42 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         )
 
     def _get_person_list(self):
-        return {
-            self.data[key]: self.data[key]
-            for key in sorted(self.data.keys())
-            if key.endswith("_name") and key.startswith("person")
-        }
+        return {person["name"]: person["name"] for person in get_records(self.data, CONF_BIRTHDAYS).values()}
 
     def _get_event_list(self):
-        return {
-            self.data[key]: self.data[key]
-            for key in sorted(self.data.keys())
-            if key.endswith("_name") and key.startswith("event")
-        }
+        return {event["name"]: event["name"] for event in get_records(self.data, CONF_EVENTS).values()}
+
+    def _person(self, person_id) -> dict:
+        return get_records(self.data, CONF_BIRTHDAYS).get(person_id, {})
+
+    def _event(self, event_id) -> dict:
+        return get_records(self.data, CONF_EVENTS).get(event_id, {})
 
     async def async_step_add_birthday(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         errors = {}
-        person_count = sum(1 for key in self.data if key.startswith("person") and key.endswith("_name"))
-
-        if person_count >= MAX_BIRTHDAYS:
-            return self.async_abort(reason="max_persons_reached")
 
         if user_input is not None:
-            for idx in range(1, MAX_BIRTHDAYS + 1):
-                if (f"person{idx}_name" in self.data and 
-                    self.data[f"person{idx}_name"] == user_input["name"]):
-                    errors["name"] = "name_already_exists"
-                    return self.async_show_form(
-                        step_id="add_birthday",
-                        data_schema=vol.Schema({
-                            vol.Required("name"): str,
-                            vol.Required("birthday"): str,
-                            vol.Optional(CONF_NOTIFICATION_ENABLED, default=False): bool,
-                            vol.Optional(CONF_AI_ENABLED, default=False): bool,
-                        }),
-                        errors=errors
-                    )
+            if find_record_id(self.data, CONF_BIRTHDAYS, user_input["name"]):
+                errors["name"] = "name_already_exists"
+                return self.async_show_form(
+                    step_id="add_birthday",
+                    data_schema=vol.Schema({
+                        vol.Required("name"): str,
+                        vol.Required("birthday"): str,
+                        vol.Optional(CONF_NOTIFICATION_ENABLED, default=False): bool,
+                        vol.Optional(CONF_AI_ENABLED, default=False): bool,
+                    }),
+                    errors=errors
+                )
             
             try:
                 validate_date(user_input["birthday"])
                 
-                new_data = dict(self.data)
-                person_count += 1
-                new_data[f"person{person_count}_name"] = user_input["name"]
-                new_data[f"person{person_count}_birthday"] = user_input["birthday"]
+                person_id = new_record_id()
+                new_data = with_record(self.data, CONF_BIRTHDAYS, person_id, {
+                    "name": user_input["name"],
+                    "birthday": user_input["birthday"],
+                })
                 new_data[CONF_BIRTHDAY_ENABLED] = True
                 
                 self._save_config(new_data)
@@ -377,7 +382,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     "birthday": user_input["birthday"],
                     "notification_enabled": user_input.get(CONF_NOTIFICATION_ENABLED, False),
                     "ai_enabled": user_input.get(CONF_AI_ENABLED, False),
-                    "current_idx": person_count,
+                    "person_id": person_id,
                     "old_name": user_input["name"]
                 }
                 
@@ -406,22 +411,19 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_add_event(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         errors = {}
-        event_count = sum(1 for key in self.data if key.startswith("event") and key.endswith("_name"))
-
-        if event_count >= MAX_EVENTS:
-            return self.async_abort(reason="max_events_reached")
 
         if user_input is not None:
             try:
                 validate_date(user_input["date"], is_event=True)
                 
-                new_data = dict(self.data)
-                event_count += 1
-                new_data[f"event{event_count}_name"] = user_input["name"]
-                new_data[f"event{event_count}_date"] = user_input["date"]
-                new_data[f"event{event_count}_desc"] = user_input.get("description", "")
-                new_data[f"event{event_count}_auto_remove"] = user_input.get("auto_remove", False)
-                new_data[f"event{event_count}_full_countdown"] = user_input.get("full_countdown", False)
+                event_id = new_record_id()
+                new_data = with_record(self.data, CONF_EVENTS, event_id, {
+                    "name": user_input["name"],
+                    "date": user_input["date"],
+                    "desc": user_input.get("description", ""),
+                    "auto_remove": user_input.get("auto_remove", False),
+                    "full_countdown": user_input.get("full_countdown", False),
+                })
                 new_data[CONF_EVENT_ENABLED] = True
                 self._save_config(new_data)
 
@@ -432,7 +434,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     "auto_remove": user_input.get("auto_remove", False),
                     "full_countdown": user_input.get("full_countdown", False),
                     "notification_enabled": user_input.get(CONF_NOTIFICATION_ENABLED, False),
-                    "current_idx": event_count
+                    "event_id": event_id
                 }
                 
                 if user_input.get("full_countdown"):
@@ -462,13 +464,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_edit_birthday(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         errors = {}
-        current_idx = None
-
-        for idx in range(1, MAX_BIRTHDAYS + 1):
-            if (f"person{idx}_name" in self.data and 
-                self.data[f"person{idx}_name"] == self.person_name):
-                current_idx = idx
-                break
+        person_id = self.person_id
+        person = self._person(person_id)
 
         if user_input is not None:
             try:
@@ -478,7 +475,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     "birthday": user_input["birthday"],
                     "notification_enabled": user_input.get(CONF_NOTIFICATION_ENABLED, False),
                     "ai_enabled": user_input.get(CONF_AI_ENABLED, False),
-                    "current_idx": current_idx,
+                    "person_id": person_id,
                     "old_name": self.person_name
                 }
                 
@@ -489,13 +486,13 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     self.person_name = user_input["name"]
                     return await self.async_step_birthday_ai_edit()
                 
-                new_data = dict(self.data)
-                new_data[f"person{current_idx}_name"] = user_input["name"]
-                new_data[f"person{current_idx}_birthday"] = user_input["birthday"]
-                if f"person{current_idx}_notification_service" in new_data:
-                    new_data.pop(f"person{current_idx}_notification_service")
-                if f"person{current_idx}_notification_message" in new_data:
-                    new_data.pop(f"person{current_idx}_notification_message")
+                new_data = with_record(self.data, CONF_BIRTHDAYS, person_id, {
+                    **person,
+                    "name": user_input["name"],
+                    "birthday": user_input["birthday"],
+                    "notification_service": None,
+                    "notification_message": None,
+                })
                 
                 self._edit_person_data = None
                 self._save_config(new_data)
@@ -508,13 +505,9 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             except vol.Invalid:
                 errors["birthday"] = "invalid_date_format"
 
-        current_birthday = ""
-        current_notification = False
-        current_ai = False
-        if current_idx:
-            current_birthday = self.data[f"person{current_idx}_birthday"]
-            current_notification = bool(self.data.get(f"person{current_idx}_notification_service"))
-            current_ai = bool(self.data.get(f"person{current_idx}_ai_api_key"))
+        current_birthday = person.get("birthday", "")
+        current_notification = bool(person.get("notification_service"))
+        current_ai = bool(person.get("ai_api_key"))
 
         return self.async_show_form(
             step_id="edit_birthday",
@@ -539,9 +532,9 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             )
         
         if not user_input:
-            current_idx = self._edit_person_data["current_idx"]
-            current_service = self.data.get(f"person{current_idx}_notification_service", "")
-            current_message = self.data.get(f"person{current_idx}_notification_message", 
+            person = self._person(self._edit_person_data["person_id"])
+            current_service = person.get("notification_service", "")
+            current_message = person.get("notification_message", 
                                         f"今天是{self._edit_person_data['name']}的生日，祝您生日快乐！🎉")
                     
             return self.async_show_form(
@@ -558,14 +551,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             )
 
         try:
-            new_data = dict(self.data)
-            current_idx = self._edit_person_data["current_idx"]
-            
-            new_data[f"person{current_idx}_name"] = self._edit_person_data["name"]
-            new_data[f"person{current_idx}_birthday"] = self._edit_person_data["birthday"]
-            
-            new_data[f"person{current_idx}_notification_service"] = user_input[CONF_NOTIFICATION_SERVICE]
-            new_data[f"person{current_idx}_notification_message"] = user_input[CONF_NOTIFICATION_MESSAGE]
+            person_id = self._edit_person_data["person_id"]
+            new_data = with_record(self.data, CONF_BIRTHDAYS, person_id, {
+                **self._person(person_id),
+                "name": self._edit_person_data["name"],
+                "birthday": self._edit_person_data["birthday"],
+                "notification_service": user_input[CONF_NOTIFICATION_SERVICE],
+                "notification_message": user_input[CONF_NOTIFICATION_MESSAGE],
+            })
             
             if self._edit_person_data and self._edit_person_data.get("ai_enabled"):
                 self._save_config(new_data)
@@ -595,9 +588,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_birthday_ai_edit(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if not user_input:
-            current_idx = self._edit_person_data["current_idx"]
-            current_api_key = self.data.get(f"person{current_idx}_ai_api_key", "")
-            current_model = self.data.get(f"person{current_idx}_ai_model", "deepseek-r1")
+            person = self._person(self._edit_person_data["person_id"])
+            current_api_key = person.get("ai_api_key", "")
+            current_model = person.get("ai_model", "deepseek-r1")
+            current_batch = person.get(CONF_AI_BATCH, False)
             
             model_options = [
                 selector.SelectOptionDict(value=model["value"], label=model["label"])
@@ -616,19 +610,21 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             
                         )
                     ),
+                    vol.Optional(CONF_AI_BATCH, default=current_batch): bool,
                 })
             )
 
         try:
-            new_data = dict(self.data)
-            current_idx = self._edit_person_data["current_idx"]
-            
-            new_data[f"person{current_idx}_name"] = self._edit_person_data["name"]
-            new_data[f"person{current_idx}_birthday"] = self._edit_person_data["birthday"]
-            
-            new_data[f"person{current_idx}_ai_api_url"] = DEFAULT_AI_API_URL
-            new_data[f"person{current_idx}_ai_api_key"] = user_input[CONF_AI_API_KEY]
-            new_data[f"person{current_idx}_ai_model"] = user_input[CONF_AI_MODEL]
+            person_id = self._edit_person_data["person_id"]
+            new_data = with_record(self.data, CONF_BIRTHDAYS, person_id, {
+                **self._person(person_id),
+                "name": self._edit_person_data["name"],
+                "birthday": self._edit_person_data["birthday"],
+                "ai_api_url": DEFAULT_AI_API_URL,
+                "ai_api_key": user_input[CONF_AI_API_KEY],
+                "ai_model": user_input[CONF_AI_MODEL],
+                CONF_AI_BATCH: user_input.get(CONF_AI_BATCH, False),
+            })
             
             self._edit_person_data = None
             self._save_config(new_data)
@@ -654,70 +650,26 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             translation_key="ai_model_options"
                         )
                     ),
+                    vol.Optional(CONF_AI_BATCH, default=False): bool,
                 }),
                 errors={"base": "save_error"}
             )
 
     async def async_step_delete_birthday(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if user_input is not None and user_input.get("confirm"):
-            new_data = dict(self.data)
             deleted_name = self.person_name
-            
-            for idx in range(1, MAX_BIRTHDAYS + 1):
-                if (f"person{idx}_name" in new_data and 
-                    new_data[f"person{idx}_name"] == self.person_name):
-                    registry = entity_registry.async_get(self.hass)
-                    entity_id = f"sensor.birthday_{self.person_name.lower()}"
-                    if entity_entry := registry.async_get(entity_id):
-                        registry.async_remove(entity_entry.entity_id)
-                        
-                    new_data.pop(f"person{idx}_name")
-                    new_data.pop(f"person{idx}_birthday")
-                    if f"person{idx}_notification_service" in new_data:
-                        new_data.pop(f"person{idx}_notification_service")
-                    if f"person{idx}_notification_message" in new_data:
-                        new_data.pop(f"person{idx}_notification_message")
-                    if f"person{idx}_ai_api_url" in new_data:
-                        new_data.pop(f"person{idx}_ai_api_url")
-                    if f"person{idx}_ai_api_key" in new_data:
-                        new_data.pop(f"person{idx}_ai_api_key")
-                    if f"person{idx}_ai_model" in new_data:
-                        new_data.pop(f"person{idx}_ai_model")
-                    break
-            
-            temp_data = {
-                CONF_BIRTHDAY_ENABLED: True,
-                CONF_EVENT_ENABLED: self.data.get(CONF_EVENT_ENABLED, False),
-                CONF_NAME: self.data[CONF_NAME]
-            }
-            
-            new_idx = 1
-            has_persons = False
-            for i in range(1, MAX_BIRTHDAYS + 1):
-                if f"person{i}_name" in new_data:
-                    has_persons = True
-                    temp_data[f"person{new_idx}_name"] = new_data[f"person{i}_name"]
-                    temp_data[f"person{new_idx}_birthday"] = new_data[f"person{i}_birthday"]
-                    if f"person{i}_notification_service" in new_data:
-                        temp_data[f"person{new_idx}_notification_service"] = new_data[f"person{i}_notification_service"]
-                    if f"person{i}_notification_message" in new_data:
-                        temp_data[f"person{new_idx}_notification_message"] = new_data[f"person{i}_notification_message"]
-                    if f"person{i}_ai_api_url" in new_data:
-                        temp_data[f"person{new_idx}_ai_api_url"] = new_data[f"person{i}_ai_api_url"]
-                    if f"person{i}_ai_api_key" in new_data:
-                        temp_data[f"person{new_idx}_ai_api_key"] = new_data[f"person{i}_ai_api_key"]
-                    if f"person{i}_ai_model" in new_data:
-                        temp_data[f"person{new_idx}_ai_model"] = new_data[f"person{i}_ai_model"]
-                    new_idx += 1
-            
-            if not has_persons:
-                temp_data[CONF_BIRTHDAY_ENABLED] = False
-            
-            for key in new_data:
-                if key.startswith("event"):
-                    temp_data[key] = new_data[key]
+            new_data = dict(self.data)
+
+            if self.person_id in get_records(self.data, CONF_BIRTHDAYS):
+                registry = entity_registry.async_get(self.hass)
+                entity_id = f"sensor.birthday_{self.person_name.lower()}"
+                if entity_entry := registry.async_get(entity_id):
+                    registry.async_remove(entity_entry.entity_id)
+                new_data = without_record(self.data, CONF_BIRTHDAYS, self.person_id)
+
+            new_data[CONF_BIRTHDAY_ENABLED] = bool(get_records(new_data, CONF_BIRTHDAYS))
 
-            self._save_config(temp_data)
+            self._save_config(new_data)
             return self.async_abort(
                 reason="person_deleted",
                 description_placeholders={"name": deleted_name}
@@ -734,33 +686,24 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_edit_event(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         errors = {}
         
-        current_idx = None
-        for idx in range(1, MAX_EVENTS + 1):
-            if (f"event{idx}_name" in self.data and 
-                self.data[f"event{idx}_name"] == self.event_name):
-                current_idx = idx
-                break
-                
-        if current_idx is None:
+        event_id = self.event_id
+        event = self._event(event_id)
+        if not event:
             return self.async_abort(reason="event_not_found")
             
-        current_date = self.data[f"event{current_idx}_date"].split()[0] if " " in self.data[f"event{current_idx}_date"] else self.data[f"event{current_idx}_date"]
-        current_desc = self.data.get(f"event{current_idx}_desc", "")
-        current_auto_remove = self.data.get(f"event{current_idx}_auto_remove", False)
-        current_full_countdown = self.data.get(f"event{current_idx}_full_countdown", False)
-        current_notification = bool(self.data.get(f"event{current_idx}_notification_service"))
+        current_date = event["date"].split()[0]
+        current_desc = event.get("desc", "")
+        current_auto_remove = event.get("auto_remove", False)
+        current_full_countdown = event.get("full_countdown", False)
+        current_notification = bool(event.get("notification_service"))
 
         if user_input is not None:
             try:
                 validate_date(user_input["date"], is_event=True)
                 
-                for idx in range(1, MAX_EVENTS + 1):
-                    if (f"event{idx}_name" in self.data and 
-                        self.data[f"event{idx}_name"] == user_input["name"] and
-                        idx != current_idx):
-                        errors["name"] = "duplicate_event_name"
-                        break
-                        
+                if find_record_id(self.data, CONF_EVENTS, user_input["name"]) not in (None, event_id):
+                    errors["name"] = "duplicate_event_name"
+
                 if not errors:
                     self._edit_event_data = {
                         "name": user_input["name"],
@@ -769,7 +712,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         "auto_remove": user_input.get("auto_remove", False),
                         "full_countdown": user_input.get("full_countdown", False),
                         "notification_enabled": user_input.get(CONF_NOTIFICATION_ENABLED, False),
-                        "current_idx": current_idx
+                        "event_id": event_id
                     }
                     
                     if user_input.get("full_countdown"):
@@ -777,14 +720,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     elif user_input.get(CONF_NOTIFICATION_ENABLED):
                         return await self.async_step_event_notification_edit()
                     
-                    new_data = dict(self.data)
-                    new_data[f"event{current_idx}_name"] = user_input["name"]
-                    new_data[f"event{current_idx}_date"] = user_input["date"]
-                    new_data[f"event{current_idx}_desc"] = user_input.get("description", "")
-                    new_data[f"event{current_idx}_auto_remove"] = user_input.get("auto_remove", False)
-                    new_data[f"event{current_idx}_full_countdown"] = False
-                    new_data.pop(f"event{current_idx}_notification_service", None)
-                    new_data.pop(f"event{current_idx}_notification_message", None)
+                    new_data = with_record(self.data, CONF_EVENTS, event_id, {
+                        **without_notification(event),
+                        "name": user_input["name"],
+                        "date": user_input["date"],
+                        "desc": user_input.get("description", ""),
+                        "auto_remove": user_input.get("auto_remove", False),
+                        "full_countdown": False,
+                    })
                     
                     self._edit_event_data = None
                     self._save_config(new_data)
@@ -824,15 +767,15 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 if self._edit_event_data.get("notification_enabled"):
                     return await self.async_step_event_notification_edit()
                 
-                new_data = dict(self.data)
-                current_idx = self._edit_event_data["current_idx"]
-                new_data[f"event{current_idx}_name"] = self._edit_event_data["name"]
-                new_data[f"event{current_idx}_date"] = f"{self._edit_event_data['date']} {time_str}"
-                new_data[f"event{current_idx}_desc"] = self._edit_event_data.get("description", "")
-                new_data[f"event{current_idx}_auto_remove"] = self._edit_event_data.get("auto_remove", False)
-                new_data[f"event{current_idx}_full_countdown"] = True
-                new_data.pop(f"event{current_idx}_notification_service", None)
-                new_data.pop(f"event{current_idx}_notification_message", None)
+                event_id = self._edit_event_data["event_id"]
+                new_data = with_record(self.data, CONF_EVENTS, event_id, {
+                    **without_notification(self._event(event_id)),
+                    "name": self._edit_event_data["name"],
+                    "date": f"{self._edit_event_data['date']} {time_str}",
+                    "desc": self._edit_event_data.get("description", ""),
+                    "auto_remove": self._edit_event_data.get("auto_remove", False),
+                    "full_countdown": True,
+                })
                 
                 self._edit_event_data = None
                 self._save_config(new_data)
@@ -930,10 +873,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             if not self._edit_event_data:
                 return self.async_abort(reason="event_not_found")
 
-            current_idx = self._edit_event_data["current_idx"]
-            current_service = self.data.get(f"event{current_idx}_notification_service", "")
-            current_message = self.data.get(
-                f"event{current_idx}_notification_message",
+            event = self._event(self._edit_event_data["event_id"])
+            current_service = event.get("notification_service", "")
+            current_message = event.get(
+                "notification_message",
                 get_template_message(self._edit_event_data["name"])
             )
 
@@ -951,21 +894,18 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             )
 
         try:
-            new_data = dict(self.data)
-            current_idx = self._edit_event_data["current_idx"]
-            new_data[f"event{current_idx}_name"] = self._edit_event_data["name"]
-            
-            if "time" in self._edit_event_data:
-                new_data[f"event{current_idx}_date"] = f"{self._edit_event_data['date']} {self._edit_event_data['time']}"
-                new_data[f"event{current_idx}_full_countdown"] = True
-            else:
-                new_data[f"event{current_idx}_date"] = self._edit_event_data["date"]
-                new_data[f"event{current_idx}_full_countdown"] = False
-                
-            new_data[f"event{current_idx}_desc"] = self._edit_event_data.get("description", "")
-            new_data[f"event{current_idx}_auto_remove"] = self._edit_event_data.get("auto_remove", False)
-            new_data[f"event{current_idx}_notification_service"] = user_input[CONF_NOTIFICATION_SERVICE]
-            new_data[f"event{current_idx}_notification_message"] = user_input[CONF_NOTIFICATION_MESSAGE]
+            has_time = "time" in self._edit_event_data
+            event_id = self._edit_event_data["event_id"]
+            new_data = with_record(self.data, CONF_EVENTS, event_id, {
+                **self._event(event_id),
+                "name": self._edit_event_data["name"],
+                "date": f"{self._edit_event_data['date']} {self._edit_event_data['time']}" if has_time else self._edit_event_data["date"],
+                "full_countdown": has_time,
+                "desc": self._edit_event_data.get("description", ""),
+                "auto_remove": self._edit_event_data.get("auto_remove", False),
+                "notification_service": user_input[CONF_NOTIFICATION_SERVICE],
+                "notification_message": user_input[CONF_NOTIFICATION_MESSAGE],
+            })
             
             self._edit_event_data = None
             self._save_config(new_data)
@@ -992,68 +932,18 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_delete_event(self, user_input: Optional[Dict[str, Any]] = None) -> FlowResult:
         if user_input is not None and user_input.get("confirm"):
-            new_data = dict(self.data)
             deleted_name = self.event_name
-            deleted_idx = None
-            
-            for idx in range(1, MAX_EVENTS + 1):
-                if (f"event{idx}_name" in new_data and 
-                    new_data[f"event{idx}_name"] == self.event_name):
-                    registry = entity_registry.async_get(self.hass)
-                    entity_id = f"sensor.event_{self.event_name.lower()}"
-                    if entity_entry := registry.async_get(entity_id):
-                        registry.async_remove(entity_entry.entity_id)
-                    deleted_idx = idx
-                    break
-            
-            if deleted_idx:
-                new_data.pop(f"event{deleted_idx}_name")
-                new_data.pop(f"event{deleted_idx}_date")
-                if f"event{deleted_idx}_desc" in new_data:
-                    new_data.pop(f"event{deleted_idx}_desc")
-                if f"event{deleted_idx}_auto_remove" in new_data:
-                    new_data.pop(f"event{deleted_idx}_auto_remove")
-                if f"event{deleted_idx}_full_countdown" in new_data:
-                    new_data.pop(f"event{deleted_idx}_full_countdown")
-                if f"event{deleted_idx}_notification_service" in new_data:
-                    new_data.pop(f"event{deleted_idx}_notification_service")
-                if f"event{deleted_idx}_notification_message" in new_data:
-                    new_data.pop(f"event{deleted_idx}_notification_message")
-
-                has_events = False
-                
-                temp_data = {
-                    CONF_BIRTHDAY_ENABLED: new_data.get(CONF_BIRTHDAY_ENABLED, False),
-                    CONF_EVENT_ENABLED: True,  
-                    CONF_NAME: new_data[CONF_NAME]
-                }
-                
-                for key in new_data:
-                    if key.startswith("person"):
-                        temp_data[key] = new_data[key]
-                
-                new_idx = 1
-                for idx in range(1, MAX_EVENTS + 1):
-                    if f"event{idx}_name" in new_data and idx != deleted_idx:
-                        has_events = True
-                        temp_data[f"event{new_idx}_name"] = new_data[f"event{idx}_name"]
-                        temp_data[f"event{new_idx}_date"] = new_data[f"event{idx}_date"]
-                        if f"event{idx}_desc" in new_data:
-                            temp_data[f"event{new_idx}_desc"] = new_data[f"event{idx}_desc"]
-                        if f"event{idx}_auto_remove" in new_data:
-                            temp_data[f"event{new_idx}_auto_remove"] = new_data[f"event{idx}_auto_remove"]
-                        if f"event{idx}_full_countdown" in new_data:
-                            temp_data[f"event{new_idx}_full_countdown"] = new_data[f"event{idx}_full_countdown"]
-                        if f"event{idx}_notification_service" in new_data:
-                            temp_data[f"event{new_idx}_notification_service"] = new_data[f"event{idx}_notification_service"]
-                        if f"event{idx}_notification_message" in new_data:
-                            temp_data[f"event{new_idx}_notification_message"] = new_data[f"event{idx}_notification_message"]
-                        new_idx += 1
-
-                if not has_events:
-                    temp_data[CONF_EVENT_ENABLED] = False
-
-                self._save_config(temp_data)
+
+            if self.event_id in get_records(self.data, CONF_EVENTS):
+                registry = entity_registry.async_get(self.hass)
+                entity_id = f"sensor.event_{self.event_name.lower()}"
+                if entity_entry := registry.async_get(entity_id):
+                    registry.async_remove(entity_entry.entity_id)
+
+                new_data = without_record(self.data, CONF_EVENTS, self.event_id)
+                new_data[CONF_EVENT_ENABLED] = bool(get_records(new_data, CONF_EVENTS))
+
+                self._save_config(new_data)
                 return self.async_abort(
                     reason="event_deleted",
                     description_placeholders={"name": deleted_name}
@@ -1101,6 +991,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 
                 async with aiofiles.open(yaml_file, 'w', encoding='utf-8') as f:
                     await f.write(yaml_content)
+                if upcoming := self.hass.data.get(DOMAIN, {}).get("upcoming"):
+                    upcoming.invalidate_calendar()
                 
                 try:
                     await self.hass.services.async_call(
@@ -13,6 +13,7 @@ CONF_AI_ENABLED = "ai_enabled"
 CONF_AI_API_URL = "ai_api_url"
 CONF_AI_API_KEY = "ai_api_key"
 CONF_AI_MODEL = "ai_model"
+CONF_AI_BATCH = "ai_batch"
 
 DEFAULT_AI_API_URL = "https://api.chatanywhere.tech"
 AI_MODELS = [
@@ -39,8 +40,21 @@ ACTIONS = ["next_day", "previous_day", "today", "query_date"]
 MAIN_SENSORS = ['日期', '农历', '八字']
 DATA_FORMAT = "%Y/%m/%d/%H"
 EVENT_DATE_FORMAT = "%Y/%m/%d"
-MAX_BIRTHDAYS = 5
-MAX_EVENTS = 30
+CONF_BIRTHDAYS = "birthdays"
+CONF_EVENTS = "events"
+
+CONF_LUNAR_CACHE_SIZE = "lunar_cache_size"
+DEFAULT_LUNAR_CACHE_SIZE = 240
+ALMANAC_TABLE_FIRST_YEAR = 1902
+ALMANAC_TABLE_LAST_YEAR = 2099
+MAX_QUERY_DAYS = 366
+AI_TIMEOUT = 30
+AI_CONCURRENCY = 2
+AI_RETRIES = 3
+AI_BACKOFF = 1.0
+AI_CACHE_DAYS = 7
+AI_BATCH_WINDOW = 2.0
+MOON_ILLUMINATION_STEP = 1.0
 
 TRANSLATIONS = {
     "zh-Hans": {
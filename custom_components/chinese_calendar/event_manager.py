@@ -1,17 +1,21 @@
+import heapq
+import itertools
 import logging
 from datetime import datetime, timedelta
 from homeassistant.components.sensor import SensorEntity
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.util import dt
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.event import async_track_point_in_time
 from homeassistant.helpers import entity_registry as er
-import zhconv   # pyright: ignore[reportMissingImports]
 
 from .const import (
     DOMAIN,
-    EVENT_DATE_FORMAT
+    EVENT_DATE_FORMAT,
+    CONF_EVENTS
 )
+from .records import get_records
+from .text_convert import resolve_language, convert_text, convert_value
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,8 +33,70 @@ class EventDevice:
             manufacturer="道教",
         )
 
+class EventScheduler:
+    """Deadline heap shared by the event sensors of one entry, served by a single point-in-time timer."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._heap = []
+        self._tokens = {}
+        self._counter = itertools.count()
+        self._unsub = None
+        self._armed = None
+
+    def schedule(self, sensor, when) -> None:
+        if when is None:
+            self.cancel(sensor)
+            return
+        token = next(self._counter)
+        self._tokens[sensor] = token
+        heapq.heappush(self._heap, (when, token, sensor))
+        self._arm()
+
+    def cancel(self, sensor) -> None:
+        self._tokens.pop(sensor, None)
+        self._arm()
+
+    def shutdown(self) -> None:
+        self._tokens.clear()
+        self._heap.clear()
+        self._arm()
+
+    def _arm(self) -> None:
+        heap = self._heap
+        while heap and self._tokens.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        when = heap[0][0] if heap else None
+        if when == self._armed:
+            return
+        if self._unsub:
+            self._unsub()
+        self._unsub, self._armed = None, when
+        if when is not None:
+            self._unsub = async_track_point_in_time(self._hass, self._async_fire, when.replace(tzinfo=dt.now().tzinfo))
+
+    async def _async_fire(self, _now) -> None:
+        self._unsub = self._armed = None
+        now = dt.now().replace(tzinfo=None)
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, token, sensor = heapq.heappop(self._heap)
+            if self._tokens.get(sensor) == token:
+                del self._tokens[sensor]
+                due.append(sensor)
+        for sensor in due:
+            try:
+                next_refresh = await sensor.async_scheduled_update()
+            except Exception as e:
+                _LOGGER.error("事件定时更新出错: %s", e)
+                continue
+            if next_refresh is not None and sensor not in self._tokens:
+                token = self._tokens[sensor] = next(self._counter)
+                heapq.heappush(self._heap, (next_refresh, token, sensor))
+        self._arm()
+
 class EventSensor(SensorEntity):
-    def __init__(self, device, event_name, event_date, event_desc, registry=None, entity_id=None, auto_remove=False, full_countdown=False, notification_service=None, notification_message=None, hass=None):
+    def __init__(self, device, event_name, event_date, event_desc, registry=None, entity_id=None, auto_remove=False, full_countdown=False, notification_service=None, notification_message=None, hass=None, scheduler=None):
         self._device = device
         self._name = event_name
         self._entity_id = entity_id
@@ -49,26 +115,16 @@ class EventSensor(SensorEntity):
         self._attributes = {}
         self._update_interval = None
         self._next_update = None
-        self._unsub_update = None
         self._hass = hass
+        self._scheduler = scheduler
         self._notification_sent = False
         self._last_update = None
 
+    def _language(self):
+        return resolve_language(self._hass, self._device._language)
+
     def _convert_text(self, text):
-        if not text or not isinstance(text, str):
-            return text
-            
-        language = self._device._language
-        if language == "auto":
-            language = self._hass.config.language
-        
-        if language == "zh-Hant":
-            try:
-                return zhconv.convert(text, 'zh-hant')
-            except Exception as e:
-                _LOGGER.error(f"转换文本时出错: {e}")
-                return text
-        return text
+        return convert_text(text, self._language())
 
     @property
     def unique_id(self):
@@ -87,8 +143,12 @@ class EventSensor(SensorEntity):
         return self._name
 
     async def async_will_remove_from_hass(self) -> None:
-        if self._unsub_update:
-            self._unsub_update()
+        if self._scheduler:
+            self._scheduler.cancel(self)
+
+    @property
+    def should_poll(self):
+        return self._scheduler is None
 
     @property
     def device_info(self):
@@ -100,40 +160,17 @@ class EventSensor(SensorEntity):
 
     @property
     def extra_state_attributes(self):
-        converted_attrs = {}
-        
-        if not self._event_date:
-            base_attrs = {
-                self._convert_text("描述"): self._event_desc,
-                self._convert_text("自动删除"): self._convert_text("开启" if self._auto_remove else "关闭"),
-                self._convert_text("完整倒计时"): self._convert_text("开启" if self._full_countdown else "关闭"),
-                self._convert_text("通知服务"): self._notification_service if self._notification_service else self._convert_text("关闭")
-            }
-        else:
-            base_attrs = {
-                self._convert_text("描述"): self._event_desc,
-                self._convert_text("日期"): self._event_date.strftime(EVENT_DATE_FORMAT),
-                self._convert_text("自动删除"): self._convert_text("开启" if self._auto_remove else "关闭"),
-                self._convert_text("完整倒计时"): self._convert_text("开启" if self._full_countdown else "关闭"),
-                self._convert_text("通知服务"): self._notification_service if self._notification_service else self._convert_text("关闭")
-            }
+        base_attrs = {"描述": self._event_desc}
+        if self._event_date:
+            base_attrs["日期"] = self._event_date.strftime(EVENT_DATE_FORMAT)
+        base_attrs.update({
+            "自动删除": "开启" if self._auto_remove else "关闭",
+            "完整倒计时": "开启" if self._full_countdown else "关闭",
+            "通知服务": self._notification_service if self._notification_service else "关闭"
+        })
+        if self._event_date:
             base_attrs.update(self._attributes)
-            
-        for key, value in base_attrs.items():
-            if isinstance(value, str):
-                converted_attrs[key] = self._convert_text(value)
-            elif isinstance(value, dict):
-                converted_dict = {}
-                for k, v in value.items():
-                    if isinstance(v, str):
-                        converted_dict[self._convert_text(k)] = self._convert_text(v)
-                    else:
-                        converted_dict[self._convert_text(k)] = v
-                converted_attrs[key] = converted_dict
-            else:
-                converted_attrs[key] = value
-                
-        return converted_attrs
+        return convert_value(base_attrs, self._language(), keys=True)
 
     @property
     def available(self):
@@ -155,37 +192,31 @@ class EventSensor(SensorEntity):
         return False
     async def async_added_to_hass(self):
         await self.async_update()
-        
-        @callback
-        async def _scheduled_update(now):
-            await self.async_update()
-
-        if self._full_countdown:
-            update_interval = timedelta(milliseconds=100)  
-        else:
-            update_interval = self._calculate_update_interval()
-
-        self._unsub_update = async_track_time_interval(
-            self.hass,
-            _scheduled_update,
-            update_interval
-        )
+        if self._scheduler:
+            self._scheduler.schedule(self, self._next_refresh(dt.now().replace(tzinfo=None)))
 
-    def _calculate_update_interval(self):
-        now = dt.now().replace(tzinfo=None)
-        delta = self._event_date - now
-        
-        if not self._full_countdown:
-            return timedelta(hours=1)
-            
-        if delta.days > 7:
-            return timedelta(hours=1)
-        elif delta.days > 1:
-            return timedelta(minutes=15)
-        elif delta.days == 1:
-            return timedelta(minutes=5)
-        else:
-            return timedelta(seconds=1)
+    async def async_scheduled_update(self):
+        await self.async_update()
+        if self._should_remove or self.hass is None:
+            return None
+        self.async_write_ha_state()
+        return self._next_refresh(dt.now().replace(tzinfo=None))
+
+    def _next_refresh(self, now):
+        """Next deadline of this event: the next change of the countdown text (whole days, or every second
+        during the last day of a full countdown), the due moment, the end of the "已到时间" hour and the
+        auto-remove moment."""
+        if not self._event_date:
+            return None
+        remaining = (self._event_date - now).total_seconds()
+        if remaining > 0:
+            step = remaining // 86400 * 86400 if remaining >= 86400 or not self._full_countdown else int(remaining)
+            return self._event_date - timedelta(seconds=step)
+        if self._full_countdown and remaining > -3600:
+            return self._event_date + timedelta(hours=1)
+        if self._auto_remove and remaining >= -86400:
+            return self._event_date + timedelta(days=1, seconds=1)
+        return None
 
     def _format_countdown(self, delta):
         if not self._full_countdown:
@@ -215,10 +246,6 @@ class EventSensor(SensorEntity):
     async def async_update(self):
         try:
             now = dt.now().replace(tzinfo=None)
-            
-            if self._last_update and (now - self._last_update).total_seconds() < 0.8:
-                return
-                
             self._last_update = now
 
             if not self._event_date:
@@ -284,65 +311,76 @@ class EventSensor(SensorEntity):
             except Exception as e:
                 _LOGGER.error("发送通知失败: %s", e)
                 
+class EventSensorGroup:
+    """Device and scheduler shared by the event sensors of one entry, and those sensors by event id."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, language: str):
+        self.hass = hass
+        self.device = EventDevice(entry_id, language)
+        self.scheduler = EventScheduler(hass)
+        self.registry = er.async_get(hass)
+        self.sensors = {}
+
+    async def async_build(self, event_id: str, event: dict) -> list:
+        """The sensor of one event, recorded under `event_id`; empty when the record lacks a name or date."""
+        if not event.get("name") or not event.get("date"):
+            return []
+        try:
+            name = event["name"]
+            sensor_id = f"sensor.event_{name.lower()}"
+            event_sensor = EventSensor(
+                device=self.device,
+                event_name=name,
+                event_date=event["date"],
+                event_desc=event.get("desc", ""),
+                auto_remove=event.get("auto_remove", False),
+                full_countdown=event.get("full_countdown", False),
+                notification_service=event.get("notification_service"),
+                notification_message=event.get("notification_message"),
+                registry=self.registry,
+                entity_id=sensor_id,
+                hass=self.hass,
+                scheduler=self.scheduler
+            )
+
+            if existing := self.registry.async_get_entity_id("sensor", DOMAIN, event_sensor.unique_id):
+                if existing != sensor_id:
+                    self.registry.async_update_entity(existing, new_entity_id=sensor_id)
+
+            self.sensors[event_id] = [event_sensor]
+            return [event_sensor]
+        except Exception as e:
+            _LOGGER.error(f"无法创建事件传感器 {event.get('name', '')}: {str(e)}")
+            return []
+
+
+def get_event_group(hass: HomeAssistant, entry_id: str, config_data: dict) -> EventSensorGroup:
+    entry_data = hass.data.setdefault(DOMAIN, {}).setdefault(entry_id, {})
+    if (group := entry_data.get("event_group")) is None:
+        group = entry_data["event_group"] = EventSensorGroup(hass, entry_id, config_data.get("language", "auto"))
+    return group
+
+
 async def setup_event_sensors(hass: HomeAssistant, entry_id: str, config_data: dict):
     entities = []
     registry = er.async_get(hass)
-    
-    existing_entries = er.async_entries_for_config_entry(registry, entry_id)
-    for entry in existing_entries:
-        if entry.unique_id and entry.unique_id.startswith(f"event_{entry_id}_"):
+    enabled = config_data.get("event_enabled", False)
+    configured = {f"event_{entry_id}_{event['name']}" for event in get_records(config_data, CONF_EVENTS).values() if enabled and event.get("name")}
+
+    for entry in er.async_entries_for_config_entry(registry, entry_id):
+        if entry.unique_id and entry.unique_id.startswith(f"event_{entry_id}_") and entry.unique_id not in configured:
             try:
-                if registry.async_get(entry.entity_id):
-                    registry.async_remove(entry.entity_id)
-                    if state := hass.states.get(entry.entity_id):
-                        hass.states.async_remove(entry.entity_id)
+                registry.async_remove(entry.entity_id)
+                if hass.states.get(entry.entity_id):
+                    hass.states.async_remove(entry.entity_id)
             except Exception as e:
                 _LOGGER.error(f"删除实体失败 {entry.entity_id}: {str(e)}")
 
-    if not config_data.get("event_enabled", False):
+    if not enabled:
         return entities
 
-    language = config_data.get("language", "auto")
-    event_device = EventDevice(entry_id, language)
-    event_count = 1
-    
-    while True:
-        name_key = f"event{event_count}_name"
-        date_key = f"event{event_count}_date"
-        
-        if name_key not in config_data or date_key not in config_data:
-            break
-            
-        try:
-            name = config_data.get(name_key)
-            sensor_id = f"sensor.event_{name.lower()}"
-            event_sensor = EventSensor(
-                device=event_device,
-                event_name=name,
-                event_date=config_data.get(date_key),
-                event_desc=config_data.get(f"event{event_count}_desc", ""),
-                auto_remove=config_data.get(f"event{event_count}_auto_remove", False),
-                full_countdown=config_data.get(f"event{event_count}_full_countdown", False),
-                notification_service=config_data.get(f"event{event_count}_notification_service"),
-                notification_message=config_data.get(f"event{event_count}_notification_message"),
-                registry=registry,
-                entity_id=sensor_id,
-                hass=hass
-            )
-
-            if registry and (unique_id := event_sensor.unique_id):
-                if existing := registry.async_get_entity_id("sensor", DOMAIN, unique_id):
-                    registry.async_update_entity(
-                        existing,
-                        new_entity_id=sensor_id,
-                        new_unique_id=unique_id
-                    )
-                    
-            entities.append(event_sensor)
-            
-        except Exception as e:
-            _LOGGER.error(f"无法创建事件传感器 {config_data.get(name_key, '')}: {str(e)}")
-        
-        event_count += 1
+    group = get_event_group(hass, entry_id, config_data)
+    for event_id, event in get_records(config_data, CONF_EVENTS).items():
+        entities.extend(await group.async_build(event_id, event))
 
-    return entities
\ No newline at end of file
+    return entities
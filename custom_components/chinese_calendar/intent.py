@@ -62,15 +62,9 @@ class AlmanacIntent(intent.IntentHandler):
         query_date = None
         if date_str:
             from datetime import datetime
-            try:
-                query_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                await hass.services.async_call(DOMAIN, "date_control", {"action": "select_date", "date": query_date}, blocking=True)
-                import asyncio
-                await asyncio.sleep(0.5)
-            except: pass
-        data = await hass.services.async_call(DOMAIN, "get_almanac", {}, blocking=True, return_response=True)
-        if date_str:
-            await hass.services.async_call(DOMAIN, "date_control", {"action": "today"}, blocking=True)
+            try: query_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            except ValueError: pass
+        data = await hass.services.async_call(DOMAIN, "get_almanac", {"date": query_date} if query_date else {}, blocking=True, return_response=True)
         result = f"{query_date.strftime('%Y年%m月%d日')}" if query_date else "今天"
         result += f"是农历{data.get('农历', '')}，{data.get('星期', '')}。"
         if data.get('今日节日') and data.get('今日节日') != '暂无节日': result += f"这天是{data.get('今日节日')}。"
@@ -0,0 +1,66 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+class LunarCalendar:
+    """Start and length of every lunar month cnlunar covers, decoded once from its lunarNewYearList / lunarMonthData.
+
+    Lunar→solar is a dict lookup, solar→lunar a bisect over the month starts; no cnlunar.Lunar is built.
+    """
+
+    def __init__(self):
+        from cnlunar.config import START_YEAR, MONTH_DAY_BIT, LEAPMONTH_NUM_BIT, lunarMonthData, lunarNewYearList  # pyright: ignore[reportMissingImports]
+        self._months = {}
+        self._starts = []
+        self._keys = []
+        for year, new_year, months in zip(range(START_YEAR, START_YEAR + len(lunarMonthData)), lunarNewYearList, lunarMonthData):
+            start = date(year, (new_year >> 5) & 0x3, new_year & 0x1f)
+            leap_month = (months >> LEAPMONTH_NUM_BIT) & 0xf
+            for month in range(1, 13):
+                start = self._add(year, month, False, start, 30 if months & (1 << (month - 1)) else 29)
+                if month == leap_month:
+                    start = self._add(year, month, True, start, 30 if months & (1 << MONTH_DAY_BIT) else 29)
+        self.first_year, self.last_year = START_YEAR, year
+        self._end = start
+
+    def _add(self, year: int, month: int, leap: bool, start: date, days: int) -> date:
+        self._months[(year, month, leap)] = (start, days)
+        self._starts.append(start)
+        self._keys.append((year, month, leap))
+        return start + timedelta(days=days)
+
+    def month_days(self, year: int, month: int, leap: bool = False) -> Optional[int]:
+        entry = self._months.get((year, month, leap))
+        return entry[1] if entry else None
+
+    def to_solar(self, year: int, month: int, day: int, leap: bool = False) -> Optional[date]:
+        """Solar date of a lunar date; day 30 of a 29-day month falls on the 29th."""
+        if (entry := self._months.get((year, month, leap))) is None:
+            return None
+        start, days = entry
+        return start + timedelta(days=min(day, days) - 1)
+
+    def to_lunar(self, when: date) -> Optional[Tuple[int, int, int, bool]]:
+        """(lunar year, month, day, is leap month) of a solar date."""
+        if not self._starts[0] <= when < self._end:
+            return None
+        i = bisect_right(self._starts, when) - 1
+        year, month, leap = self._keys[i]
+        return year, month, (when - self._starts[i]).days + 1, leap
+
+    def next_anniversary(self, month: int, day: int, today: date) -> Optional[date]:
+        """First solar date on or after `today` that is lunar (month, day) in a regular month; leap months are skipped."""
+        if (lunar := self.to_lunar(today)) is None:
+            return None
+        for year in (lunar[0], lunar[0] + 1):
+            if (when := self.to_solar(year, month, day)) is not None and when >= today:
+                return when
+        return None
+
+
+@lru_cache(maxsize=None)
+def lunar_calendar() -> LunarCalendar:
+    """Shared table; decoding takes a couple of milliseconds once cnlunar is imported."""
+    return LunarCalendar()
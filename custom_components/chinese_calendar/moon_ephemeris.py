@@ -0,0 +1,154 @@
+"""Low-precision lunar ephemeris shared by the 月相 sensor.
+
+Moon age follows the mean synodic month, so phase boundaries fall at fixed offsets
+within every lunation and a whole year of them is one arithmetic batch. The other
+quantities (illumination, distance, magnitude, apparent size) are evaluated for many
+instants at once with NumPy when it is installed, and with `math` otherwise.
+"""
+import math
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np  # pyright: ignore[reportMissingImports]
+except ImportError:
+    np = None
+
+SYNODIC_MONTH = 29.530588853
+NEW_MOON_EPOCH_JD = 2451550.1
+J2000_JD = 2451545.0
+J2000 = datetime(2000, 1, 1, 12)
+MOON_RADIUS_KM = 1737.1
+ELONGATION_EPOCH = 297.8501921
+ELONGATION_RATE = 445267.1114034
+PHASE_THRESHOLDS = (
+    (0.5, '朔月'),
+    (6.5, '峨眉月'),
+    (7.5, '上弦月'),
+    (13.5, '渐盈凸月'),
+    (14.5, '满月'),
+    (20.5, '渐亏凸月'),
+    (21.5, '下弦月'),
+    (27.5, '残月'),
+    (float('inf'), '朔月'),
+)
+_BOUNDARIES = tuple(t for t, _ in PHASE_THRESHOLDS[:-1])
+_PHASES_AFTER = tuple(p for _, p in PHASE_THRESHOLDS[1:])
+
+
+def julian_day(when: datetime) -> float:
+    y, m = when.year, when.month
+    if m <= 2:
+        y -= 1
+        m += 12
+    a = y // 100
+    b = 2 - a + a // 4
+    return int(365.25 * (y + 4716)) + int(30.6001 * (m + 1)) + when.day + b - 1524.5 + (when.hour + when.minute / 60 + when.second / 3600) / 24
+
+
+def from_julian_day(jd: float) -> datetime:
+    return J2000 + timedelta(days=float(jd) - J2000_JD)
+
+
+def moon_age(jd: float) -> float:
+    return (jd - NEW_MOON_EPOCH_JD) % SYNODIC_MONTH
+
+
+def phase_name(age: float) -> str:
+    return next(p for t, p in PHASE_THRESHOLDS if age < t)
+
+
+def ephemeris(jds) -> dict:
+    """Moon age (days), illumination (%), distance (km), magnitude and apparent diameter (degrees) for each Julian day."""
+    if np is not None:
+        jd = np.asarray(jds, dtype=float)
+        t = (jd - J2000_JD) / 36525
+        cos_d = np.cos(np.radians(ELONGATION_EPOCH + ELONGATION_RATE * t))
+        distance = 385000.56 * (1.0 - 0.0549 * cos_d)
+        return {
+            "age": (jd - NEW_MOON_EPOCH_JD) % SYNODIC_MONTH,
+            "illumination": (1 + cos_d) / 2 * 100,
+            "distance": distance,
+            "magnitude": -12.74 + 5 * np.log10(distance / 384400),
+            "diameter": np.degrees(2 * np.arcsin(MOON_RADIUS_KM / distance)),
+        }
+    result = {"age": [], "illumination": [], "distance": [], "magnitude": [], "diameter": []}
+    for jd in jds:
+        t = (jd - J2000_JD) / 36525
+        cos_d = math.cos(math.radians(ELONGATION_EPOCH + ELONGATION_RATE * t))
+        distance = 385000.56 * (1.0 - 0.0549 * cos_d)
+        result["age"].append(moon_age(jd))
+        result["illumination"].append((1 + cos_d) / 2 * 100)
+        result["distance"].append(distance)
+        result["magnitude"].append(-12.74 + 5 * math.log10(distance / 384400))
+        result["diameter"].append(math.degrees(2 * math.asin(MOON_RADIUS_KM / distance)))
+    return result
+
+
+def moon_at(when: datetime) -> dict:
+    """Ephemeris values of one instant as plain floats, plus its phase name."""
+    values = {k: float(v[0]) for k, v in ephemeris([julian_day(when)]).items()}
+    values["phase"] = phase_name(values["age"])
+    return values
+
+
+def next_illumination_step(jd: float, step: float = 1.0) -> float:
+    """Julian day at which the illumination next reaches a multiple of `step` percent."""
+    d = (ELONGATION_EPOCH + ELONGATION_RATE * (jd - J2000_JD) / 36525) % 360
+    illumination = (1 + math.cos(math.radians(d))) / 2 * 100
+    if d >= 180:
+        level = min((math.floor(illumination / step) + 1) * step, 100.0)
+        target = 360 - math.degrees(math.acos(max(-1.0, min(1.0, level / 50 - 1))))
+    else:
+        level = max((math.ceil(illumination / step) - 1) * step, 0.0)
+        target = math.degrees(math.acos(max(-1.0, min(1.0, level / 50 - 1))))
+    return jd + (target - d) / ELONGATION_RATE * 36525
+
+
+def ceil_second(when: datetime) -> datetime:
+    return when.replace(microsecond=0) + timedelta(seconds=1) if when.microsecond else when
+
+
+def phase_boundaries(start_jd: float, end_jd: float) -> Tuple[list, list]:
+    """Julian days of every phase boundary in [start_jd, end_jd) and the phase that begins at each."""
+    first = math.floor((start_jd - NEW_MOON_EPOCH_JD) / SYNODIC_MONTH)
+    last = math.ceil((end_jd - NEW_MOON_EPOCH_JD) / SYNODIC_MONTH)
+    if np is not None:
+        jds = (NEW_MOON_EPOCH_JD + np.arange(first, last + 1)[:, None] * SYNODIC_MONTH + np.array(_BOUNDARIES)[None, :]).ravel()
+        phases = list(_PHASES_AFTER) * (last - first + 1)
+        keep = np.flatnonzero((jds >= start_jd) & (jds < end_jd))
+        return jds[keep].tolist(), [phases[i] for i in keep]
+    jds, phases = [], []
+    for n in range(first, last + 1):
+        for offset, phase in zip(_BOUNDARIES, _PHASES_AFTER):
+            if start_jd <= (jd := NEW_MOON_EPOCH_JD + n * SYNODIC_MONTH + offset) < end_jd:
+                jds.append(jd)
+                phases.append(phase)
+    return jds, phases
+
+
+class PhaseCalendar:
+    """Precomputed phase transitions of a time span; boundaries where the phase name does not change are dropped."""
+
+    def __init__(self, start: datetime, days: int = 366):
+        self.start, self.end = start, start + timedelta(days=days)
+        jds, phases = phase_boundaries(julian_day(self.start), julian_day(self.end))
+        self._times: List[datetime] = []
+        self._phases: List[str] = []
+        current = phase_name(moon_age(julian_day(self.start)))
+        for jd, phase in zip(jds, phases):
+            if phase != current:
+                self._times.append(ceil_second(from_julian_day(jd)))
+                self._phases.append(phase)
+                current = phase
+
+    def covers(self, when: datetime) -> bool:
+        return self.start <= when < self.end
+
+    def next_transition(self, when: datetime) -> Optional[Tuple[datetime, str]]:
+        i = bisect_right(self._times, when)
+        return (self._times[i], self._phases[i]) if i < len(self._times) else None
+
+    def __len__(self) -> int:
+        return len(self._times)
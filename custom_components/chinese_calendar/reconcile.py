@@ -0,0 +1,64 @@
+import logging
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from .const import DOMAIN, CONF_BIRTHDAYS, CONF_EVENTS, CONF_BIRTHDAY_ENABLED, CONF_EVENT_ENABLED
+from .records import get_records
+from .birthday_manager import async_get_birthday_group
+from .event_manager import get_event_group
+
+_LOGGER = logging.getLogger(__name__)
+
+_KINDS = ((CONF_BIRTHDAYS, CONF_BIRTHDAY_ENABLED), (CONF_EVENTS, CONF_EVENT_ENABLED))
+
+
+def _active_records(config: dict, kind: str, enabled_key: str) -> dict:
+    return get_records(config, kind) if config.get(enabled_key) else {}
+
+
+def changed_record_ids(old: dict, new: dict) -> set:
+    return {rid for rid in old.keys() | new.keys() if old.get(rid) != new.get(rid)}
+
+
+async def async_reconcile_entities(hass: HomeAssistant, entry: ConfigEntry, old_config: dict, new_config: dict) -> bool:
+    """Replace only the birthday and event sensors whose records were added, edited or removed.
+
+    Toggling birthday_enabled / event_enabled counts as adding or removing every record of that kind.
+    Returns False when the sensor platform of the entry is not loaded, so the caller can fall back to a reload.
+    """
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id) or {}
+    if (add_entities := entry_data.get("add_entities")) is None:
+        return False
+
+    removed, added = [], []
+    for kind, enabled_key in _KINDS:
+        old, new = _active_records(old_config, kind, enabled_key), _active_records(new_config, kind, enabled_key)
+        if not (changed := changed_record_ids(old, new)):
+            continue
+        if kind == CONF_BIRTHDAYS:
+            group = await async_get_birthday_group(hass, entry.entry_id, new_config)
+        else:
+            group = get_event_group(hass, entry.entry_id, new_config)
+        for rid in changed:
+            removed.extend(group.sensors.pop(rid, []))
+            if rid in new:
+                added.extend(await group.async_build(rid, new[rid]))
+        if kind == CONF_BIRTHDAYS:
+            group.retain()
+
+    registry = er.async_get(hass)
+    kept = {entity.unique_id for entity in added}
+    for entity in removed:
+        try:
+            if entity.platform is not None:
+                await entity.async_remove(force_remove=True)
+            if entity.unique_id not in kept and (entity_id := registry.async_get_entity_id("sensor", DOMAIN, entity.unique_id)):
+                registry.async_remove(entity_id)
+        except Exception as e:
+            _LOGGER.error(f"移除实体失败 {entity.unique_id}: {str(e)}")
+
+    if added:
+        add_entities(added, True)
+    if removed or added:
+        _LOGGER.debug(f"配置变更：移除{len(removed)}个实体，新增{len(added)}个实体")
+    return True
@@ -0,0 +1,186 @@
+import uuid
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from .lunar_calendar import lunar_calendar
+from .const import (
+    CONF_BIRTHDAYS,
+    CONF_EVENTS,
+    DATA_FORMAT,
+    EVENT_DATE_FORMAT,
+)
+
+PERSON_FIELDS = ("name", "birthday", "is_lunar", "notification_service", "notification_message", "ai_api_url", "ai_api_key", "ai_model")
+EVENT_FIELDS = ("name", "date", "desc", "is_lunar", "auto_remove", "full_countdown", "notification_service", "notification_message")
+SOLAR = "solar"
+LUNAR = "lunar"
+_FLAT_PREFIX = {CONF_BIRTHDAYS: ("person", PERSON_FIELDS), CONF_EVENTS: ("event", EVENT_FIELDS)}
+
+
+def new_record_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_records(data: dict, kind: str) -> Dict[str, dict]:
+    return data.get(kind) or {}
+
+
+def find_record_id(data: dict, kind: str, name: str) -> Optional[str]:
+    return next((rid for rid, record in get_records(data, kind).items() if record.get("name") == name), None)
+
+
+def with_record(data: dict, kind: str, record_id: str, record: dict) -> dict:
+    """Copy of `data` with `record` stored under `record_id`; insertion order of existing records is kept."""
+    new_data = dict(data)
+    new_data[kind] = {**get_records(data, kind), record_id: {k: v for k, v in record.items() if v is not None}}
+    return new_data
+
+
+def without_record(data: dict, kind: str, record_id: str) -> dict:
+    new_data = dict(data)
+    new_data[kind] = {rid: record for rid, record in get_records(data, kind).items() if rid != record_id}
+    return new_data
+
+
+def migrate_flat_records(data: dict) -> dict:
+    """Move the legacy person{i}_* / event{i}_* keys into id-keyed birthday and event collections."""
+    new_data = {}
+    collections = {CONF_BIRTHDAYS: {}, CONF_EVENTS: {}}
+    flat = {}
+    for key, value in data.items():
+        for kind, (prefix, fields) in _FLAT_PREFIX.items():
+            if key.startswith(prefix) and (field := next((f for f in fields if key.endswith(f"_{f}")), None)):
+                index = key[len(prefix):-len(field) - 1]
+                if index.isdigit():
+                    flat.setdefault((kind, int(index)), {})[field] = value
+                    break
+        else:
+            new_data[key] = value
+    for (kind, _), record in sorted(flat.items(), key=lambda item: item[0]):
+        if record.get("name"):
+            collections[kind][new_record_id()] = record
+    for kind, records in collections.items():
+        new_data[kind] = {**get_records(data, kind), **records}
+    return new_data
+
+
+def parse_birthday(value: str) -> datetime:
+    return datetime.strptime(value, DATA_FORMAT)
+
+
+def parse_event_date(value: str) -> date:
+    return datetime.strptime(value.split()[0], EVENT_DATE_FORMAT).date()
+
+
+def next_solar_birthday(birthday: date, today: date) -> date:
+    """Next anniversary on or after `today`; 2月29日 falls on 2月28日 in common years."""
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = birthday.replace(year=year)
+        except ValueError:
+            candidate = date(year, 2, 28)
+        if candidate >= today:
+            return candidate
+    return candidate
+
+
+def next_lunar_birthday(birthday: date, today: date) -> Optional[date]:
+    """Next solar date of the lunar birthday of someone born on the solar date `birthday`."""
+    calendar = lunar_calendar()
+    if (lunar := calendar.to_lunar(birthday)) is None:
+        return None
+    return calendar.next_anniversary(lunar[1], lunar[2], today)
+
+
+class RecordIndex:
+    """Birthdays and events of one entry by stable id, plus their next occurrences kept sorted for range scans.
+
+    Every birthday has a solar and a lunar occurrence; events have their one solar date.
+    """
+
+    def __init__(self, data: dict, today: Optional[date] = None):
+        self.birthdays = dict(get_records(data, CONF_BIRTHDAYS))
+        self.events = dict(get_records(data, CONF_EVENTS))
+        self._index_names()
+        self._today = today or date.today()
+        self._occurrences = sorted(
+            entry for kind in (CONF_BIRTHDAYS, CONF_EVENTS) for rid, record in self.records(kind).items()
+            for entry in self._occurrences_of(kind, rid, record, self._today)
+        )
+
+    def _index_names(self) -> None:
+        self._names = {(kind, record["name"]): rid for kind in (CONF_BIRTHDAYS, CONF_EVENTS) for rid, record in self.records(kind).items()}
+
+    @property
+    def today(self) -> date:
+        return self._today
+
+    def records(self, kind: str) -> Dict[str, dict]:
+        return self.birthdays if kind == CONF_BIRTHDAYS else self.events
+
+    def find(self, kind: str, name: str) -> Optional[str]:
+        return self._names.get((kind, name))
+
+    def names(self, kind: str) -> List[str]:
+        return [record["name"] for record in self.records(kind).values()]
+
+    @staticmethod
+    def _occurrence(kind: str, record_id: str, record: dict, today: date, calendar: str = SOLAR):
+        try:
+            if kind == CONF_EVENTS:
+                when = parse_event_date(record["date"])
+            elif calendar == LUNAR:
+                when = next_lunar_birthday(parse_birthday(record["birthday"]).date(), today)
+            else:
+                when = next_solar_birthday(parse_birthday(record["birthday"]).date(), today)
+        except (KeyError, ValueError):
+            return None
+        return (when, kind, record_id, calendar) if when is not None and when >= today else None
+
+    def _occurrences_of(self, kind: str, record_id: str, record: dict, today: date) -> list:
+        calendars = (SOLAR, LUNAR) if kind == CONF_BIRTHDAYS else (SOLAR,)
+        return [entry for calendar in calendars if (entry := self._occurrence(kind, record_id, record, today, calendar)) is not None]
+
+    def update(self, data: dict) -> None:
+        """Re-date only the records that were added, edited or removed since the index was built."""
+        changed = set()
+        for kind in (CONF_BIRTHDAYS, CONF_EVENTS):
+            old, new = self.records(kind), dict(get_records(data, kind))
+            changed |= {(kind, rid) for rid in old.keys() | new.keys() if old.get(rid) != new.get(rid)}
+            if kind == CONF_BIRTHDAYS:
+                self.birthdays = new
+            else:
+                self.events = new
+        if not changed:
+            return
+        self._index_names()
+        self._occurrences = [entry for entry in self._occurrences if (entry[1], entry[2]) not in changed]
+        for kind, rid in changed:
+            if (record := self.records(kind).get(rid)) is not None:
+                for entry in self._occurrences_of(kind, rid, record, self._today):
+                    insort(self._occurrences, entry)
+
+    def roll(self, today: date) -> None:
+        """Advance to `today`: only the occurrences that have passed are re-dated, the rest of the order is kept."""
+        if today <= self._today:
+            return
+        self._today = today
+        passed = self._occurrences[:bisect_left(self._occurrences, (today,))]
+        del self._occurrences[:len(passed)]
+        for _, kind, rid, calendar in passed:
+            if (entry := self._occurrence(kind, rid, self.records(kind)[rid], today, calendar)) is not None:
+                insort(self._occurrences, entry)
+
+    def upcoming(self, start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None, kinds=None) -> List[dict]:
+        start = max(start or self._today, self._today)
+        result = []
+        for when, kind, rid, calendar in self._occurrences[bisect_left(self._occurrences, (start,)):]:
+            if (end and when > end) or (limit is not None and len(result) >= limit):
+                break
+            if kinds and kind not in kinds:
+                continue
+            result.append({"date": when.isoformat(), "days": (when - self._today).days, "kind": kind, "calendar": calendar, "id": rid, "name": self.records(kind)[rid]["name"]})
+        return result
+
+    def __len__(self) -> int:
+        return len(self.birthdays) + len(self.events)
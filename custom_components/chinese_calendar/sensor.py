@@ -20,10 +20,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     if "almanac_sensors" not in hass.data[DOMAIN]:
         hass.data[DOMAIN]["almanac_sensors"] = {}
 
+    if entry_data := hass.data[DOMAIN].get(entry.entry_id):
+        entry_data["add_entities"] = async_add_entities
+
     entities = []
     registered_names = hass.data[DOMAIN]["registered_names"].get(entry.entry_id, set())
 
-    if almanac_result := await setup_almanac_sensors(hass, entry.entry_id, entry.data):
+    if almanac_result := await setup_almanac_sensors(hass, entry.entry_id, {**entry.data, **entry.options}):
         almanac_entities, almanac_sensors = almanac_result
         entities.extend(almanac_entities)
         hass.data[DOMAIN]["almanac_sensors"][entry.entry_id] = almanac_sensors
@@ -1,14 +1,31 @@
 import asyncio
 from datetime import datetime, timedelta
 from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.util import dt
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
-from .const import DOMAIN
+from .const import DOMAIN, MAX_QUERY_DAYS
+from .almanac_engine import ALMANAC_TYPES, TimeHelper
+from .text_convert import resolve_language, convert_value
+from .upcoming import UPCOMING_KINDS, get_upcoming_index
+from .lunar_calendar import lunar_calendar
+from .moon import moon_days
 
 SERVICE_DATE_CONTROL = "date_control"
+SERVICE_GET_ALMANAC_RANGE = "get_almanac_range"
+SERVICE_GET_UPCOMING = "get_upcoming"
+SERVICE_GET_MOON_RANGE = "get_moon_range"
 ATTR_ACTION = "action"
 ATTR_DATE = "date"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_FIELDS = "fields"
+ATTR_HOUR = "hour"
+ATTR_INCLUDE_ATTRIBUTES = "include_attributes"
+ATTR_DAYS = "days"
+ATTR_LIMIT = "limit"
+ATTR_KINDS = "kinds"
 ACTIONS = ["next_day", "previous_day", "today", "select_date"]
 
 DATE_CONTROL_SCHEMA = vol.Schema({
@@ -16,6 +33,72 @@ DATE_CONTROL_SCHEMA = vol.Schema({
     vol.Optional(ATTR_DATE): vol.Any(cv.date, None),
 })
 
+ALMANAC_RANGE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_END_DATE): cv.date,
+    vol.Optional(ATTR_FIELDS): vol.All(cv.ensure_list, [vol.In(ALMANAC_TYPES)]),
+    vol.Optional(ATTR_HOUR): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+    vol.Optional(ATTR_INCLUDE_ATTRIBUTES, default=False): cv.boolean,
+})
+
+UPCOMING_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_DAYS, default=30): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_QUERY_DAYS)),
+    vol.Optional(ATTR_LIMIT): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(ATTR_KINDS): vol.All(cv.ensure_list, [vol.In(UPCOMING_KINDS)]),
+})
+
+MOON_RANGE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_END_DATE): cv.date,
+})
+
+def get_almanac_engine(hass: HomeAssistant):
+    return next(iter(hass.data.get(DOMAIN, {}).get("almanac_engines", {}).values()), None)
+
+async def async_query_almanac(hass: HomeAssistant, when: datetime) -> dict:
+    """Almanac for one moment without touching current_date or any entity state."""
+    if (engine := get_almanac_engine(hass)) is None:
+        raise ValueError("未找到老黄历数据")
+    if (snapshot := await engine.async_snapshot(when)) is None:
+        raise ValueError("计算黄历数据失败")
+    data = {k: snapshot[k][0] for k in ALMANAC_TYPES if k in snapshot}
+    data["时辰"] = TimeHelper.get_current_shichen(when.hour, when.minute)
+    return convert_value(data, resolve_language(hass, engine.device._language))
+
+async def async_query_almanac_range(hass: HomeAssistant, start, end=None, fields=None, hour=None, include_attributes=False) -> dict:
+    end = end or start
+    if end < start:
+        raise ValueError("结束日期不能早于开始日期")
+    if (end - start).days >= MAX_QUERY_DAYS:
+        raise ValueError(f"查询范围不能超过{MAX_QUERY_DAYS}天")
+    if (engine := get_almanac_engine(hass)) is None:
+        raise ValueError("未找到老黄历数据")
+    hour = dt.now().hour if hour is None else hour
+    data = await hass.async_add_executor_job(engine.query_range, start, end, fields, hour, include_attributes)
+    return convert_value(data, resolve_language(hass, engine.device._language))
+
+async def async_query_upcoming(hass: HomeAssistant, start=None, days=30, limit=None, kinds=None) -> dict:
+    """Birthdays, events, holidays and customdays coming up in the `days` days from `start`, soonest first."""
+    if days < 1 or days > MAX_QUERY_DAYS:
+        raise ValueError(f"查询范围不能超过{MAX_QUERY_DAYS}天")
+    today = dt.now().date()
+    start = max(start or today, today)
+    items = await get_upcoming_index(hass).async_upcoming(start, start + timedelta(days=days - 1), limit, kinds)
+    return {"today": today.isoformat(), "start": start.isoformat(), "end": (start + timedelta(days=days - 1)).isoformat(), "items": items}
+
+async def async_query_moon_range(hass: HomeAssistant, start, end=None) -> dict:
+    """Moon phase, age, illumination, 夜月 and 吉凶 of every day in [start, end], without touching the 月相 entity."""
+    end = end or start
+    if end < start:
+        raise ValueError("结束日期不能早于开始日期")
+    if (end - start).days >= MAX_QUERY_DAYS:
+        raise ValueError(f"查询范围不能超过{MAX_QUERY_DAYS}天")
+    calendar = lunar_calendar()
+    if calendar.to_lunar(start) is None or calendar.to_lunar(end) is None:
+        raise ValueError(f"仅支持{calendar.first_year}年至{calendar.last_year}年的日期")
+    return {"start": start.isoformat(), "end": end.isoformat(), "days": await hass.async_add_executor_job(moon_days, start, end)}
+
 async def async_setup_date_service(hass: HomeAssistant) -> None:
     if DOMAIN not in hass.data:
         hass.data[DOMAIN] = {}
@@ -77,27 +160,25 @@ async def async_setup_date_service(hass: HomeAssistant) -> None:
 
   
     async def handle_get_almanac(call: ServiceCall) -> dict:
-        data = {}
-        sensors = hass.data.get(DOMAIN, {}).get("almanac_sensors", {})
-        for ss in sensors.values():
-            for s in ss:
-                if s.state: data[s._type] = s.state
-        return data
+        now = dt.as_local(dt.now()).replace(tzinfo=None)
+        when = datetime.combine(call.data[ATTR_DATE], now.time()) if call.data.get(ATTR_DATE) else now
+        try:
+            return await async_query_almanac(hass, when)
+        except ValueError as e:
+            raise HomeAssistantError(str(e)) from e
     
     async def handle_get_events(call: ServiceCall) -> dict:
         result = {"birthdays": [], "events": []}
-        for entry_data in [v for v in hass.data.get(DOMAIN, {}).values() if isinstance(v, dict) and "config" in v]:
-            config = entry_data.get("config", {})
-            for i in range(1, 6):
-                name, bday, lunar = config.get(f"person{i}_name"), config.get(f"person{i}_birthday"), config.get(f"person{i}_is_lunar", False)
-                if name and bday: result["birthdays"].append({"name": name, "date": bday, "lunar": lunar})
-            for i in range(1, 31):
-                name, edate, lunar = config.get(f"event{i}_name"), config.get(f"event{i}_date"), config.get(f"event{i}_is_lunar", False)
-                if name and edate: result["events"].append({"name": name, "date": edate, "lunar": lunar})
+        for entry_data in [v for v in hass.data.get(DOMAIN, {}).values() if isinstance(v, dict) and "records" in v]:
+            records = entry_data["records"]
+            for rid, person in records.birthdays.items():
+                result["birthdays"].append({"id": rid, "name": person["name"], "date": person["birthday"], "lunar": person.get("is_lunar", False)})
+            for rid, event in records.events.items():
+                result["events"].append({"id": rid, "name": event["name"], "date": event["date"], "lunar": event.get("is_lunar", False)})
             break
         return result
     
-    hass.services.async_register(DOMAIN, "get_almanac", handle_get_almanac, schema=vol.Schema({}), supports_response=True)
+    hass.services.async_register(DOMAIN, "get_almanac", handle_get_almanac, schema=vol.Schema({vol.Optional(ATTR_DATE): cv.date}), supports_response=True)
     hass.services.async_register(DOMAIN, "get_events", handle_get_events, schema=vol.Schema({}), supports_response=True)
     
     async def handle_get_holidays(call: ServiceCall) -> dict:
@@ -115,4 +196,41 @@ async def async_setup_date_service(hass: HomeAssistant) -> None:
         data_year = int(list(holidays.keys())[0][:4]) if holidays else current_year
         return {"holidays": holidays, "customdays": customdays, "workdays": workdays, "data_year": data_year, "current_year": current_year}
     
-    hass.services.async_register(DOMAIN, "get_holidays", handle_get_holidays, schema=vol.Schema({}), supports_response=True)
\ No newline at end of file
+    hass.services.async_register(DOMAIN, "get_holidays", handle_get_holidays, schema=vol.Schema({}), supports_response=True)
+
+    async def handle_get_almanac_range(call: ServiceCall) -> dict:
+        try:
+            return await async_query_almanac_range(
+                hass,
+                call.data[ATTR_START_DATE],
+                call.data.get(ATTR_END_DATE),
+                call.data.get(ATTR_FIELDS),
+                call.data.get(ATTR_HOUR),
+                call.data[ATTR_INCLUDE_ATTRIBUTES],
+            )
+        except ValueError as e:
+            raise HomeAssistantError(str(e)) from e
+
+    hass.services.async_register(DOMAIN, SERVICE_GET_ALMANAC_RANGE, handle_get_almanac_range, schema=ALMANAC_RANGE_SCHEMA, supports_response=True)
+
+    async def handle_get_upcoming(call: ServiceCall) -> dict:
+        try:
+            return await async_query_upcoming(
+                hass,
+                call.data.get(ATTR_START_DATE),
+                call.data[ATTR_DAYS],
+                call.data.get(ATTR_LIMIT),
+                call.data.get(ATTR_KINDS),
+            )
+        except ValueError as e:
+            raise HomeAssistantError(str(e)) from e
+
+    hass.services.async_register(DOMAIN, SERVICE_GET_UPCOMING, handle_get_upcoming, schema=UPCOMING_SCHEMA, supports_response=True)
+
+    async def handle_get_moon_range(call: ServiceCall) -> dict:
+        try:
+            return await async_query_moon_range(hass, call.data[ATTR_START_DATE], call.data.get(ATTR_END_DATE))
+        except ValueError as e:
+            raise HomeAssistantError(str(e)) from e
+
+    hass.services.async_register(DOMAIN, SERVICE_GET_MOON_RANGE, handle_get_moon_range, schema=MOON_RANGE_SCHEMA, supports_response=True)
@@ -0,0 +1,53 @@
+import logging
+import warnings
+from functools import lru_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+HANT = "zh-Hant"
+
+
+def resolve_language(hass, language: str) -> str:
+    return hass.config.language if language == "auto" and hass else language
+
+
+@lru_cache(maxsize=None)
+def load_zhconv():
+    """Import zhconv on first use; it pulls in pkg_resources, which dominates import time."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="pkg_resources is deprecated", category=UserWarning)
+        import zhconv  # pyright: ignore[reportMissingImports]
+    return zhconv
+
+
+async def async_preload_converter(hass, language: str) -> None:
+    """Warm zhconv in the executor so the first zh-Hant conversion does not import it on the event loop."""
+    if resolve_language(hass, language) == HANT:
+        await hass.async_add_executor_job(lambda: load_zhconv().convert("黄历", 'zh-hant'))
+
+
+@lru_cache(maxsize=8192)
+def to_hant(text: str) -> str:
+    try:
+        return load_zhconv().convert(text, 'zh-hant')
+    except Exception as e:
+        _LOGGER.error(f"转换文本时出错: {e}")
+        return text
+
+
+def convert_text(text, language: str):
+    if language != HANT or not text or not isinstance(text, str):
+        return text
+    return to_hant(text)
+
+
+def convert_value(value, language: str, keys: bool = False):
+    """Convert a string or a (nested) dict of strings; dict keys are converted too when `keys` is set."""
+    if language != HANT:
+        return value
+    if isinstance(value, str):
+        return to_hant(value) if value else value
+    if isinstance(value, dict):
+        return {(convert_text(k, language) if keys else k): convert_value(v, language, keys) for k, v in value.items()}
+    return value
+
@@ -0,0 +1,57 @@
+import functools
+import logging
+import time
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LoopBlockTimer:
+    """Awaitable wrapper that sums the time a coroutine spends running on the event loop, excluding time spent suspended."""
+
+    def __init__(self, coro):
+        self._coro = coro
+        self.blocked = 0.0
+
+    def __await__(self):
+        it = self._coro.__await__()
+        value, exc = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                yielded = it.throw(exc) if exc is not None else it.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.blocked += time.perf_counter() - start
+            try:
+                value, exc = (yield yielded), None
+            except GeneratorExit:
+                it.close()
+                raise
+            except BaseException as e:
+                value, exc = None, e
+
+
+def timed_setup(func):
+    """Record wall time and event loop blocking time of a setup coroutine under hass.data[DOMAIN]["setup_timing"]."""
+
+    @functools.wraps(func)
+    async def wrapper(hass, *args, **kwargs):
+        start = time.perf_counter()
+        timer = LoopBlockTimer(func(hass, *args, **kwargs))
+        try:
+            return await timer
+        finally:
+            key = func.__name__
+            if args and (entry_id := getattr(args[0], "entry_id", None)):
+                key = f"{key}:{entry_id}"
+            elapsed = (time.perf_counter() - start) * 1000
+            blocked = timer.blocked * 1000
+            hass.data.setdefault(DOMAIN, {}).setdefault("setup_timing", {})[key] = {
+                "blocked_ms": round(blocked, 2),
+                "elapsed_ms": round(elapsed, 2),
+            }
+            _LOGGER.debug("%s 阻塞事件循环 %.1f ms，总耗时 %.1f ms", key, blocked, elapsed)
+
+    return wrapper
@@ -0,0 +1,88 @@
+import asyncio
+import heapq
+import logging
+import os
+from bisect import bisect_left
+from datetime import date, datetime
+from itertools import islice
+from typing import List, Optional
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt
+from .const import DOMAIN, CONF_BIRTHDAYS, CONF_EVENTS
+from .records import SOLAR
+
+_LOGGER = logging.getLogger(__name__)
+
+CALENDAR_KINDS = ("holidays", "customdays")
+UPCOMING_KINDS = (CONF_BIRTHDAYS, CONF_EVENTS) + CALENDAR_KINDS
+HWORKDAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hworkdays.yaml")
+
+
+def load_calendar_days(path: str = HWORKDAYS_PATH) -> List[tuple]:
+    """Sorted (date, kind, name) rows for the holidays and customdays of hworkdays.yaml."""
+    import yaml
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    rows = []
+    for kind in CALENDAR_KINDS:
+        for day, name in (data.get(kind) or {}).items():
+            try:
+                rows.append((datetime.strptime(str(day), "%Y-%m-%d").date(), kind, name))
+            except ValueError:
+                continue
+    return sorted(rows)
+
+
+class UpcomingIndex:
+    """Next occurrences across every entry's birthdays and events and the hworkdays.yaml days, merged at query time."""
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._calendar: Optional[List[tuple]] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate_calendar(self) -> None:
+        self._calendar = None
+
+    def _record_indexes(self) -> list:
+        return [v["records"] for v in self.hass.data.get(DOMAIN, {}).values() if isinstance(v, dict) and "records" in v]
+
+    async def async_load_calendar(self) -> None:
+        async with self._lock:
+            if self._calendar is not None:
+                return
+            try:
+                self._calendar = await self.hass.async_add_executor_job(load_calendar_days)
+            except Exception as e:
+                _LOGGER.error(f"读取节假日数据失败: {e}")
+                self._calendar = []
+
+    def _calendar_upcoming(self, today: date, start: date, end: Optional[date], limit: Optional[int], kinds) -> List[dict]:
+        result = []
+        for when, kind, name in self._calendar[bisect_left(self._calendar, (start,)):]:
+            if (end and when > end) or (limit is not None and len(result) >= limit):
+                break
+            if kinds and kind not in kinds:
+                continue
+            result.append({"date": when.isoformat(), "days": (when - today).days, "kind": kind, "calendar": SOLAR, "name": name})
+        return result
+
+    async def async_upcoming(self, start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None, kinds=None) -> List[dict]:
+        """Occurrences from `start` (default today) through `end`, soonest first, at most `limit` of them."""
+        today = dt.now().date()
+        if self._calendar is None:
+            await self.async_load_calendar()
+        indexes = self._record_indexes()
+        for index in indexes:
+            index.roll(today)
+        start = max(start or today, today)
+        sources = [index.upcoming(start, end, limit, kinds) for index in indexes]
+        sources.append(self._calendar_upcoming(today, start, end, limit, kinds))
+        return list(islice(heapq.merge(*sources, key=lambda item: item["date"]), limit))
+
+
+def get_upcoming_index(hass: HomeAssistant) -> UpcomingIndex:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (index := domain_data.get("upcoming")) is None:
+        index = domain_data["upcoming"] = UpcomingIndex(hass)
+    return index
@@ -0,0 +1,42 @@
+"""Regenerate custom_components/chinese_calendar/almanac_table.bin.xz.
+
+Run from the repository root with cnlunar installed:
+
+    python scripts/build_almanac_table.py [first_year last_year]
+
+The integration only loads this file at startup; commit the result whenever
+cnlunar or the day record fields change. cnlunar builds 宜/忌 from sets, so the
+script pins PYTHONHASHSEED to make rebuilds byte-for-byte reproducible.
+"""
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.chinese_calendar"
+
+
+def load_package():
+    """Import the integration modules without running its __init__ (which needs Home Assistant)."""
+    sys.path.insert(0, str(ROOT))
+    for name, path in (("custom_components", ROOT / "custom_components"), (PACKAGE, ROOT / "custom_components" / "chinese_calendar")):
+        module = sys.modules.setdefault(name, types.ModuleType(name))
+        module.__path__ = [str(path)]
+
+
+def main(argv):
+    load_package()
+    from custom_components.chinese_calendar.almanac_table import TABLE_SOURCE, build_table
+    from custom_components.chinese_calendar.const import ALMANAC_TABLE_FIRST_YEAR, ALMANAC_TABLE_LAST_YEAR
+    first_year, last_year = (int(argv[0]), int(argv[1])) if len(argv) == 2 else (ALMANAC_TABLE_FIRST_YEAR, ALMANAC_TABLE_LAST_YEAR)
+    start = time.perf_counter()
+    build_table(TABLE_SOURCE, first_year, last_year)
+    print(f"{TABLE_SOURCE}: {first_year}-{last_year}, {Path(TABLE_SOURCE).stat().st_size} bytes, {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        os.execve(sys.executable, [sys.executable, *sys.argv], {**os.environ, "PYTHONHASHSEED": "0"})
+    main(sys.argv[1:])